@@ -0,0 +1,113 @@
+"""
+    bench_catalog.py -- compare explanation lookup through the parsed
+                        catalog with the original parse-on-every-lookup
+                        path
+
+    Usage:   python benchmarks/bench_catalog.py [number]
+
+"""
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import splain
+splain.use_capture('off')
+
+from splain.catalog import IF_SEP, get_catalog
+from splain.content import EXCEP_CONTENT
+
+
+def legacy_parse_splaintext(selected_type):
+    """ the original Splain.parse_splaintext(); blocks of message
+        variants (which it predates) are skipped """
+
+    text = EXCEP_CONTENT.strip()
+
+    splain_dict = {}
+    excep_blocks = re.split(r'\n=====\n', text)
+    for excep_block in excep_blocks:
+
+        desc_blocks = re.split(r'\n===\n', excep_block)
+
+        head_block = desc_blocks[0]
+        desc_blocks = desc_blocks[1:]
+
+        head_lines = head_block.splitlines()
+        excep_type = head_lines[0].strip()
+        excep_headline = head_lines[1].strip()
+
+        if not len(head_lines) > 2:
+            excep_desc = ''
+        elif len(head_lines) == 3 and re.search(r'^\s*$', head_lines[2]):
+            excep_desc = ''
+        elif not re.search(r'^\s*$', head_lines[2]):
+            raise ValueError(excep_type)
+        elif not len(head_lines) > 3:
+            excep_desc = ''
+        else:
+            excep_desc = '\n'.join(head_lines[3:])
+
+        splain_dict[excep_type] = { 'headline': excep_headline,
+                                    'desc': excep_desc           }
+
+        for block in desc_blocks:
+            block_lines = block.splitlines()
+            block_type = block_lines[0].strip()
+            if IF_SEP in block_type:
+                continue
+            block_text = '\n'.join(block_lines[1:])
+            splain_dict[excep_type][block_type.lower()] = block_text
+
+    return splain_dict[selected_type]
+
+
+def legacy_lookup(excep_type, values):
+    """ the original Splain.__init__() substitution loop """
+
+    fields = legacy_parse_splaintext(excep_type)
+    for key in fields:
+        for xc_key in values:
+            try:
+                fields[key] = fields[key].format(**{xc_key: values[xc_key]})
+            except KeyError:
+                pass
+    return fields
+
+
+def catalog_lookup(excep_type, values):
+    return get_catalog().render(excep_type, values)
+
+
+def main(number=2000):
+    types = list(get_catalog())
+    values = { 'text': 'Traceback (most recent call last): ...',
+               'announce': 'Traceback (most recent call last):',
+               'filepath': '/path/to/script.py',
+               'filename': 'script.py',
+               'line_no': '12',
+               'code_line': "    x = d['missing']",
+               'error_line': "KeyError: 'missing'",
+               'type': 'KeyError',
+               'msg': "'missing'" }
+
+    for excep_type in types:
+        assert legacy_lookup(excep_type, values) == catalog_lookup(excep_type, values)
+
+    def run(func):
+        for excep_type in types:
+            func(excep_type, values)
+
+    print('{} lookups per run, {} runs'.format(len(types), number))
+    results = {}
+    for name, func in (('legacy', legacy_lookup), ('catalog', catalog_lookup)):
+        seconds = min(timeit.repeat(lambda: run(func), number=number, repeat=3))
+        results[name] = seconds / (number * len(types))
+        print('{:10}{:10.2f} us/lookup'.format(name, results[name] * 1e6))
+    print('{:10}{:10.1f}x'.format('speedup', results['legacy'] / results['catalog']))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,83 @@
+"""
+    bench_import.py -- check the cost of 'import splain' against a budget
+
+    Runs 'python -X importtime' on a script that imports splain (splain
+    refuses to be imported without a __main__ file), with bytecode
+    caching enabled, and exits with status 1 if the cumulative import
+    time of the splain package is over budget, or if any module that
+    should load lazily was imported.
+
+    Usage:   python benchmarks/bench_import.py [budget_ms]
+
+"""
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BUDGET_MS = 5.0
+RUNS = 7
+
+# modules that must not be loaded until an exception is explained
+LAZY_MODULES = ('splain.catalog', 'splain.content', 'splain.parser',
+                'splain.telemetry', 'splain.fork', 'splain.hooks',
+                'splain.store', 'splain.source', 'splain.timing',
+                'splain.handler', 'splain.pack', 'splain.aio',
+                'sqlite3', 'asyncio',
+                'urllib.request', 'urllib.parse', 'textwrap', 're',
+                'json', 'socket', 'functools')
+
+SCRIPT = '''
+import sys
+sys.path.insert(0, {root!r})
+before = set(sys.modules)
+import splain
+splain.use_capture('off')
+print(' '.join(sorted(set(sys.modules) - before)))
+'''
+
+
+def import_time(script, env):
+    """ return (microseconds, newly imported modules) for one run """
+
+    result = subprocess.run([sys.executable, '-X', 'importtime', script],
+                            env=env, capture_output=True, text=True,
+                            check=True)
+    cumulative = None
+    for line in result.stderr.splitlines():
+        fields = line.split('|')
+        if len(fields) == 3 and fields[2].strip() == 'splain':
+            cumulative = int(fields[1])
+    return cumulative, result.stdout.split()
+
+
+def main(budget_ms=BUDGET_MS):
+    with tempfile.TemporaryDirectory() as tmp:
+        script = os.path.join(tmp, 'import_splain.py')
+        with open(script, 'w') as fh:
+            fh.write(SCRIPT.format(root=ROOT))
+        env = dict(os.environ, PYTHONPYCACHEPREFIX=os.path.join(tmp, 'pyc'))
+        env.pop('PYTHONDONTWRITEBYTECODE', None)
+        env.pop('SPLAIN_FORWARD', None)
+
+        import_time(script, env)            # write the bytecode cache
+        runs = [import_time(script, env) for _ in range(RUNS)]
+
+    best_ms = min(usec for usec, modules in runs) / 1000
+    loaded = [name for name in LAZY_MODULES if name in runs[0][1]]
+
+    print('import splain:  {:.2f} ms (budget {:.2f} ms)'.format(best_ms, budget_ms))
+    ok = True
+    if best_ms > budget_ms:
+        print('FAIL:  over budget')
+        ok = False
+    if loaded:
+        print('FAIL:  imported eagerly:  ' + ', '.join(loaded))
+        ok = False
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(*[float(arg) for arg in sys.argv[1:2]]))
@@ -0,0 +1,235 @@
+"""
+    bench_suite.py -- what splain costs:  capture overhead, parse
+                      latency, catalog lookup and exit latency
+
+    Usage:   python benchmarks/bench_suite.py [--quick] [--output FILE]
+
+    Writes a JSON document of results to STDOUT (or FILE), so runs can
+    be compared across releases; a readable summary goes to STDERR.
+    Every result is the best of several repeats, in nanoseconds per
+    operation.
+
+      write.*      one sys.stderr.write() of a log line, to /dev/null
+                   directly and through each capture backend
+      excep.*      Excep + Splain construction from traceback text,
+                   over a corpus of synthetic tracebacks
+      lookup.*     Splain.parse_splaintext() for every catalog type,
+                   decoding one entry of a small and a large catalog
+                   pack, and choosing among 500 message variants
+      source.*     source context for one frame, from a cached file
+      exit.*       read_stderr() at program exit, text output to
+                   /dev/null, telemetry disabled; the local exception
+                   store (store.py) off, and on in a temporary directory
+
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import splain
+splain.use_capture('off')
+
+from splain import splain as core
+from splain.capture import (BufferCapture, SpillCapture, StreamCapture,
+                            ThreadCapture)
+from splain.catalog import get_catalog
+from splain.parser import CONTEXT_MARKER, TRACEBACK_STRING
+from splain import store
+from splain.telemetry import disable_telemetry
+
+LINE = 'WARNING worker reporting progress on item 12345\n'
+
+
+def best_ns(func, number, repeat=5):
+    """ best time of repeat runs of func() number times, in ns per call """
+
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / number * 1e9
+
+
+def make_traceback(excep_type, msg, depth=1, chained=1):
+    """ traceback text with depth frames per exception and chained
+        exceptions (the last of type excep_type) """
+
+    sections = []
+    for link in range(chained):
+        lines = [TRACEBACK_STRING]
+        for i in range(depth):
+            lines.append('  File "/app/pkg/module{}.py", line {}, in func{}'
+                         .format(i, 10 + i, i))
+            lines.append('    result = func{}(value, key)'.format(i + 1))
+        error_type = excep_type if link == chained - 1 else 'KeyError'
+        lines.append('{}: {}'.format(error_type, msg))
+        sections.append('\n'.join(lines))
+    return ('\n\n' + CONTEXT_MARKER + '\n\n').join(sections) + '\n'
+
+
+def corpus():
+    """ {name: [traceback text]} """
+
+    types = list(get_catalog())
+    return { 'catalog_types': [make_traceback(t, 'example message') for t in types],
+             'deep_stack': [make_traceback('KeyError', "'key'", depth=500)],
+             'chained': [make_traceback('ValueError', 'bad value', chained=5)],
+             'huge_message': [make_traceback('ValueError', 'x' * 100000)] }
+
+
+def bench_writes(number):
+    results = {}
+    with open(os.devnull, 'w') as devnull:
+        results['write.devnull'] = best_ns(lambda: devnull.write(LINE), number)
+        for name, capture in (('buffer', BufferCapture()),
+                              ('stream', StreamCapture(devnull)),
+                              ('threaded', ThreadCapture()),
+                              ('spill', SpillCapture()),
+                              ('spill_file', SpillCapture(threshold=0))):
+            write = capture.write
+            results['write.' + name] = best_ns(lambda: write(LINE), number)
+    return results
+
+
+def bench_excep(number):
+    results = {}
+    for name, texts in corpus().items():
+        def construct():
+            for text in texts:
+                core.Excep(text)
+        results['excep.' + name] = best_ns(construct, number) / len(texts)
+    return results
+
+
+def bench_lookup(number):
+    types = list(get_catalog())
+
+    def lookup():
+        for excep_type in types:
+            core.Splain.parse_splaintext(excep_type)
+    return { 'lookup.parse_splaintext': best_ns(lookup, number) / len(types) }
+
+
+def bench_packs(number, tmp):
+    from splain.pack import Pack, write_pack
+
+    entry = { 'headline': 'headline', 'desc': 'description',
+              'debug': 'debug at line {line_no}', 'debug_strategy': 'strategy' }
+    results = {}
+    for size in (10, 10000):
+        path = os.path.join(tmp, 'bench{}.splainpack'.format(size))
+        write_pack({ 'pkg.Error{}'.format(i): entry for i in range(size) }, path)
+        pack = Pack(path)
+        name = 'pkg.Error{}'.format(size // 3)
+        results['lookup.pack_{}'.format(size)] = best_ns(lambda: pack.load(name),
+                                                         number)
+    return results
+
+
+def bench_dispatch(number):
+    from splain.catalog import MessageDispatch, Template
+
+    templates = { 'headline': Template('headline') }
+    for i in range(500):
+        pattern = "'Type{}' object has no attribute '\\w+'".format(i)
+        templates['headline IF ' + pattern] = Template(str(i))
+    dispatch = MessageDispatch(templates)
+    msg = "'Type250' object has no attribute 'append'"
+    return { 'lookup.message_dispatch': best_ns(lambda: dispatch.select(msg),
+                                                number) }
+
+
+def bench_source(number):
+    from splain.source import context
+
+    path = core.__file__
+    context(path, 100)
+
+    return { 'source.context': best_ns(lambda: context(path, 100), number) }
+
+
+def bench_exit(number, store_path=''):
+    """ read_stderr() with a captured traceback, as at program exit """
+
+    os.environ['SPLAIN_STORE'] = store_path
+    store.forget_store()
+    suffix = '_store' if store_path else ''
+    results = {}
+    prev_text = LINE * 1000
+    tb_text = make_traceback('KeyError', "'key'", depth=10)
+    saved = sys.stdout, sys.stderr, core.OUTPUT_MODE
+    with open(os.devnull, 'w') as devnull:
+        core.use_output('text')
+        for name, text in (('no_exception', prev_text),
+                           ('exception', prev_text + tb_text)):
+            def exit_once():
+                capture = BufferCapture()
+                capture.write(text)
+                sys.stdout = devnull
+                sys.stderr = capture
+                sys.__stderr__, real = devnull, sys.__stderr__
+                try:
+                    core.read_stderr()
+                finally:
+                    sys.__stderr__ = real
+            try:
+                results['exit.' + name + suffix] = best_ns(exit_once, number)
+            finally:
+                sys.stdout, sys.stderr = saved[:2]
+    core.use_output(saved[2])
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1].strip())
+    parser.add_argument('--quick', action='store_true',
+                        help='fewer iterations, for a smoke test')
+    parser.add_argument('--output', metavar='FILE',
+                        help='write the JSON results here instead of STDOUT')
+    args = parser.parse_args(argv)
+
+    scale = 0.05 if args.quick else 1
+    disable_telemetry()
+
+    results = {}
+    results.update(bench_writes(int(200000 * scale) or 1))
+    results.update(bench_excep(int(200 * scale) or 1))
+    results.update(bench_lookup(int(2000 * scale) or 1))
+    with tempfile.TemporaryDirectory() as tmp:
+        results.update(bench_packs(int(2000 * scale) or 1, tmp))
+    results.update(bench_dispatch(int(20000 * scale) or 1))
+    results.update(bench_source(int(20000 * scale) or 1))
+    results.update(bench_exit(int(200 * scale) or 1))
+    with tempfile.TemporaryDirectory() as tmp:
+        results.update(bench_exit(int(200 * scale) or 1,
+                                  os.path.join(tmp, 'exceptions.sqlite3')))
+
+    for name, value in results.items():
+        sys.stderr.write('{:32}{:14.0f} ns/op\n'.format(name, value))
+
+    document = { 'python': platform.python_version(),
+                 'implementation': platform.python_implementation(),
+                 'platform': platform.platform(),
+                 'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                 'unit': 'ns/op',
+                 'results': results }
+    text = json.dumps(document, indent=2) + '\n'
+    if args.output:
+        with open(args.output, 'w') as fh:
+            fh.write(text)
+    else:
+        sys.stdout.write(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
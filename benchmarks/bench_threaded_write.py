@@ -0,0 +1,57 @@
+"""
+    bench_threaded_write.py -- STDERR write throughput of the capture
+                               backends with many threads writing at once
+
+    Usage:   python benchmarks/bench_threaded_write.py [threads] [writes]
+
+"""
+import io
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import splain
+splain.use_capture('off')
+
+from splain.capture import BufferCapture, ThreadCapture
+
+LINE = 'WARNING worker reporting progress on item 12345\n'
+
+
+def run(capture, threads, writes):
+    """ return seconds taken for threads x writes concurrent writes """
+
+    barrier = threading.Barrier(threads + 1)
+
+    def writer():
+        write = capture.write
+        barrier.wait()
+        for _ in range(writes):
+            write(LINE)
+
+    workers = [threading.Thread(target=writer) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - start
+
+
+def main(threads=8, writes=100000):
+    total = threads * writes
+    print('{} threads x {} writes'.format(threads, writes))
+    for name, factory in (('StringIO', io.StringIO),
+                          ('buffer', BufferCapture),
+                          ('threaded', ThreadCapture)):
+        seconds = min(run(factory(), threads, writes) for _ in range(3))
+        print('{:10}{:10.0f} ns/write{:12.2f} M writes/s'.format(
+              name, seconds / total * 1e9, total / seconds / 1e6))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:3]])
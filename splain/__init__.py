@@ -1,5 +1,24 @@
 
 
-from .splain import read_stderr
 
 
+from .splain import (add_pack, add_timing_hook, read_stderr,
+                     remove_timing_hook, render_cache_info, timing_stats,
+                     use_capture, use_output)
+
+
+def __getattr__(name):
+    # loaded on first use, to keep 'import splain' cheap
+    if name == 'forward_children':
+        from .fork import forward_children
+        return forward_children
+    if name == 'install_asyncio':
+        from .aio import install
+        return install
+    if name == 'SplainHandler':
+        from .handler import SplainHandler
+        return SplainHandler
+    if name == 'top_exceptions':
+        from .store import top_exceptions
+        return top_exceptions
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
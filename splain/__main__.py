@@ -0,0 +1,10 @@
+"""
+    python -m splain -- explain the tracebacks found in log files
+                        (see batch.py)
+"""
+import sys
+
+from .batch import main
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""
+    aio.py -- explain the exceptions an asyncio event loop reports
+
+        import asyncio, splain
+
+        async def main():
+            splain.install_asyncio()
+            ...
+
+    An exception that escapes a task nobody awaits, or a callback, is
+    passed to the loop's exception handler, not to sys.excepthook, and
+    so never reaches splain.  install() sets an exception handler that
+    takes the exception object from the handler's context and explains
+    it from its traceback (Excep.from_exception).  The handler itself
+    only schedules the work:  building the explanation, sending the log
+    record and writing the output run in an executor (by default, the
+    loop's), so other coroutines are never held up.  Exceptions splain
+    does not cover, and reports without an exception, go to the handler
+    that was in place before (by default, the loop's own).
+
+"""
+import asyncio
+import sys
+
+
+class ExceptionHandler:
+
+    """ an event loop exception handler (see install())
+
+        .previous   the handler replaced (None:  the loop's default)
+    """
+
+    def __init__(self, previous=None, executor=None, output='text',
+                       stream=None):
+        from .splain import check_live_output
+
+        check_live_output(output)
+        self.previous = previous
+        self.executor = executor
+        self.output = output
+        self.stream = stream
+
+    def __call__(self, loop, context):
+        exc = context.get('exception')
+        if exc is None:
+            self.pass_on(loop, context)
+            return
+        try:
+            future = loop.run_in_executor(self.executor, self.explain, loop,
+                                          exc, context)
+        except RuntimeError:
+            # loop or executor shut down:  no coroutine left to hold up
+            from .splain import ExceptionNotImplementedError, write_explanation
+
+            try:
+                write_explanation(exc, None, self.output, self.stream,
+                                  context.get('message'))
+            except ExceptionNotImplementedError:
+                self.pass_on(loop, context)
+        else:
+            future.add_done_callback(self.explained)
+
+    @staticmethod
+    def explained(future):
+        """ report a failure of explain(), which would otherwise be
+            left in the future ('exception was never retrieved') """
+
+        if future.cancelled():
+            return
+        exc = future.exception()
+        if exc is not None and sys.__stderr__:
+            import traceback
+            sys.__stderr__.write('--- splain: error explaining an '
+                                 'asyncio exception ---\n')
+            traceback.print_exception(type(exc), exc, exc.__traceback__,
+                                      file=sys.__stderr__)
+
+    def pass_on(self, loop, context):
+        """ report context through the handler splain replaced """
+
+        if self.previous is not None:
+            self.previous(loop, context)
+        else:
+            loop.default_exception_handler(context)
+
+    def explain(self, loop, exc, context):
+        """ explain exc (called off the loop); an exception splain does
+            not cover is handed back to the loop's previous handler """
+
+        from .splain import ExceptionNotImplementedError, write_explanation
+
+        try:
+            write_explanation(exc, None, self.output, self.stream,
+                              context.get('message'))
+        except ExceptionNotImplementedError:
+            try:
+                loop.call_soon_threadsafe(self.pass_on, loop, context)
+            except RuntimeError:    # loop closed meanwhile:  nothing
+                self.pass_on(loop, context)     # left to run it on
+
+
+def install(loop=None, executor=None, output='text', stream=None):
+    """ explain the exceptions reported to loop (default: the running
+        loop) -- written to stream (default: the real STDERR) in the
+        'text', 'summary' or 'json' format, by a job in executor
+        (default: the loop's); return the ExceptionHandler """
+
+    if loop is None:
+        loop = asyncio.get_running_loop()
+    current = loop.get_exception_handler()
+    if isinstance(current, ExceptionHandler):
+        return current
+    handler = ExceptionHandler(current, executor, output, stream)
+    loop.set_exception_handler(handler)
+    return handler
+
+
+def uninstall(loop=None):
+    """ restore the exception handler that install() replaced """
+
+    if loop is None:
+        loop = asyncio.get_running_loop()
+    current = loop.get_exception_handler()
+    if isinstance(current, ExceptionHandler):
+        loop.set_exception_handler(current.previous)
@@ -0,0 +1,227 @@
+"""
+    batch.py -- explain the tracebacks found in log files
+
+    Usage:   python -m splain [-j JOBS] [--counts-only] [--context N]
+                              LOGFILE [LOGFILE ...]
+             python -m splain --follow [--checkpoint FILE] LOGFILE
+
+    Each file is memory-mapped and split into chunks; a process pool
+    searches each chunk for TRACEBACK_STRING at the byte level, parses
+    the tracebacks that start in it (parser.py) and runs them through
+    Excep/Splain.  Only the traceback text itself is ever decoded, so
+    memory use stays well below file size.
+
+    Each distinct exception (type, file, line and error message) is
+    explained once, with the number of times it occurred, followed by
+    counts per exception type.  With --context, each explanation is
+    followed by the source lines around every frame, where the source
+    files can still be read (see source.py).
+
+    With --follow, a single log file is watched instead, and each
+    traceback is explained as it is appended (see follow.py).
+
+"""
+import argparse
+import collections
+import functools
+import mmap
+import multiprocessing
+import os
+import sys
+
+from .parser import TRACEBACK_STRING, TracebackParser, follows_chain_marker
+
+TRACEBACK_BYTES = TRACEBACK_STRING.encode('ascii')
+
+CHUNK_SIZE = 16 * 1024 * 1024       # bytes of log handed to a worker at once
+MAX_TRACEBACK = 1024 * 1024         # characters; longer tracebacks are skipped
+CHAIN_LOOKBACK = 256                # bytes searched for a chain marker
+
+
+def chunk_tasks(paths, chunk_size=CHUNK_SIZE):
+    """ yield (path, start, end) byte ranges covering each file """
+
+    for path in paths:
+        size = os.path.getsize(path)
+        for start in range(0, size, chunk_size):
+            yield path, start, min(start + chunk_size, size)
+
+
+def find_tracebacks(mm, start, end):
+    """ yield a parser.ParsedTraceback for each traceback announced in
+        mm[start:end] (a traceback may run past end); the byte search
+        skips ahead between tracebacks, and the parser reads only the
+        lines of the tracebacks themselves """
+
+    parser = TracebackParser(MAX_TRACEBACK)
+    size = len(mm)
+    # a marker that starts before end belongs to this chunk
+    search_end = min(size, end + len(TRACEBACK_BYTES) - 1)
+    pos = mm.find(TRACEBACK_BYTES, start, search_end)
+    while pos >= 0:
+        before = mm[max(0, pos - CHAIN_LOOKBACK):pos].decode('utf-8', 'replace')
+        if follows_chain_marker(before):
+            # the rest of a chain that started in the previous chunk
+            pos = mm.find(TRACEBACK_BYTES, pos + 1, search_end)
+            continue
+
+        line_start = pos
+        while line_start < size:
+            newline = mm.find(b'\n', line_start)
+            line_end = size if newline < 0 else newline + 1
+            line = mm[line_start:line_end]
+            if (line_start >= end and TRACEBACK_BYTES in line
+                    and not parser.chaining):
+                break               # belongs to the next chunk
+            tb = parser.feed_line(line.decode('utf-8', 'replace'))
+            if tb is not None:
+                yield tb
+            line_start = line_end
+            if parser.idle:
+                break
+        yield from parser.close()
+        if line_start >= end:
+            return
+        pos = mm.find(TRACEBACK_BYTES, line_start, search_end)
+
+
+def analyze_chunk(task, render=True, context=0):
+    """ explain the tracebacks starting in one chunk; return
+        (type_counts, {key: [count, explanation]}) where key is
+        (type, filename, line_no, error_line); with context, each
+        explanation ends with that many source lines around each
+        frame """
+
+    from .splain import Excep, ExceptionNotImplementedError
+
+    path, start, end = task
+    type_counts = collections.Counter()
+    explained = {}
+
+    with open(path, 'rb') as fh:
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if hasattr(mmap, 'MADV_SEQUENTIAL'):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            for parsed in find_tracebacks(mm, start, end):
+                try:
+                    xc = Excep.from_parsed(parsed)
+                except ExceptionNotImplementedError:
+                    type_counts[parsed.final.type] += 1
+                    continue
+
+                type_counts[xc.type] += 1
+                key = (xc.type, xc.filename, xc.line_no, xc.error_line)
+                if key in explained:
+                    explained[key][0] += 1
+                else:
+                    text = xc.splain.render() if render else ''
+                    if render and context:
+                        from .source import format_context
+                        text += '\nSOURCE\n' + format_context(xc.frames, context)
+                    explained[key] = [1, text]
+
+    return type_counts, explained
+
+
+def _init_worker():
+    from .store import disable_store
+    from .telemetry import disable_telemetry
+    disable_telemetry()
+    disable_store()
+
+
+def analyze(paths, jobs=None, chunk_size=CHUNK_SIZE, render=True, context=0):
+    """ analyze log files over a pool of jobs processes; return the
+        merged (type_counts, explained) as analyze_chunk() does """
+
+    type_counts = collections.Counter()
+    explained = {}
+    tasks = chunk_tasks([path for path in paths if os.path.getsize(path)],
+                        chunk_size)
+    func = functools.partial(analyze_chunk, render=render, context=context)
+
+    with multiprocessing.Pool(jobs, initializer=_init_worker) as pool:
+        for counts, chunk_explained in pool.imap_unordered(func, tasks):
+            type_counts.update(counts)
+            for key, (count, text) in chunk_explained.items():
+                if key in explained:
+                    explained[key][0] += count
+                else:
+                    explained[key] = [count, text]
+
+    return type_counts, explained
+
+
+def report(type_counts, explained, out=sys.stdout):
+    """ write explanations (most frequent first) and type counts """
+
+    for key, (count, text) in sorted(explained.items(),
+                                     key=lambda item: -item[1][0]):
+        if text:
+            out.write(text)
+            out.write('\n(occurred {} time{})\n\n\n'.format(
+                      count, '' if count == 1 else 's'))
+
+    out.write('EXCEPTION COUNTS\n')
+    for excep_type, count in type_counts.most_common():
+        out.write('{:>10}  {}\n'.format(count, excep_type))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m splain',
+                                     description='explain the tracebacks '
+                                                 'found in log files')
+    parser.add_argument('logfiles', nargs='+', metavar='LOGFILE')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='worker processes (default: one per CPU)')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE // 2**20,
+                        metavar='MB', help='size of the chunks handed '
+                                           'to workers (default: %(default)s)')
+    parser.add_argument('--counts-only', action='store_true',
+                        help='show only the counts per exception type')
+    parser.add_argument('--context', type=int, default=0, metavar='N',
+                        help='show N source lines around each frame')
+    parser.add_argument('-f', '--follow', action='store_true',
+                        help='watch LOGFILE and explain tracebacks as '
+                             'they are appended')
+    parser.add_argument('--checkpoint', metavar='FILE',
+                        help='with --follow:  where to keep the offset '
+                             'reached (default: under ~/.cache/splain)')
+    parser.add_argument('--interval', type=float, metavar='SECS',
+                        help='with --follow:  seconds between polls of '
+                             'an idle file (default: 1)')
+    parser.add_argument('--from-start', action='store_true',
+                        help='with --follow:  with no checkpoint, start '
+                             'at the beginning of the file, not its end')
+    args = parser.parse_args(argv)
+    if args.chunk_size < 1:
+        parser.error('--chunk-size must be at least 1 (MB)')
+    if args.jobs is not None and args.jobs < 1:
+        parser.error('--jobs must be at least 1')
+    if not args.follow:
+        # (a followed file may not have been created yet)
+        for path in args.logfiles:
+            if not os.path.exists(path):
+                parser.error('{}: no such file'.format(path))
+            if not os.path.isfile(path):
+                parser.error('{}: not a file'.format(path))
+            if not os.access(path, os.R_OK):
+                parser.error('{}: not readable'.format(path))
+
+    _init_worker()
+    if args.follow:
+        from .follow import POLL_INTERVAL, checkpoint_path, follow
+
+        if len(args.logfiles) != 1:
+            parser.error('--follow takes a single LOGFILE')
+        path = args.logfiles[0]
+        follow(path, args.checkpoint or checkpoint_path(path),
+               args.interval or POLL_INTERVAL, args.from_start)
+        return 0
+
+    type_counts, explained = analyze(args.logfiles, jobs=args.jobs,
+                                     chunk_size=args.chunk_size * 2**20,
+                                     render=not args.counts_only,
+                                     context=args.context)
+    report(type_counts, explained)
+    return 0
@@ -0,0 +1,318 @@
+"""
+    capture.py -- STDERR capture backends for splain
+
+    Each backend replaces sys.stderr while the program runs.  At
+    program termination, read_stderr() calls the backend's collect()
+    method, which returns a (prev_stderr_text, traceback_text) pair:
+    any text that still has to be shown, and the traceback region
+    (empty if no traceback was written).
+
+    A backend whose .echoed attribute is true has already written its
+    text through to the real STDERR, so nothing needs to be replayed.
+    SpillCapture replays the text before the traceback itself, straight
+    from its file, so it too returns no prev_stderr_text.
+
+"""
+import io
+import os
+import sys
+from _thread import RLock, get_ident
+
+TRACEBACK_STRING = 'Traceback (most recent call last):'
+TRACEBACK_BYTES = TRACEBACK_STRING.encode('ascii')
+
+# most characters held for one traceback in streaming mode;
+# a traceback that grows past this is dropped
+TAIL_LIMIT = 64 * 1024
+
+# bytes held in memory in spill mode; past this, text goes to a file
+SPILL_THRESHOLD = 1024 * 1024
+COPY_CHUNK = 1024 * 1024            # bytes per write when replaying
+
+
+class BufferCapture(io.StringIO):
+
+    """ holds all text written to STDERR until program termination
+        (splain's original behavior) """
+
+    echoed = False
+
+    def collect(self):
+        text = self.getvalue()
+        index = text.find(TRACEBACK_STRING)
+        if index < 0:
+            return text, ''
+        return text[:index], text[index:]
+
+
+class StreamCapture(io.TextIOBase):
+
+    """ writes STDERR text straight through to the real STDERR, while
+        a TracebackParser picks out tracebacks as they are written;
+        only the most recent one (at most TAIL_LIMIT characters) is
+        retained, so memory use stays constant no matter how much is
+        written.  The parser is fed under a lock:  concurrent writers
+        would otherwise interleave its state changes. """
+
+    echoed = True
+
+    def __init__(self, stream=None, limit=TAIL_LIMIT):
+        from .parser import TracebackParser
+
+        self.stream = stream if stream is not None else sys.__stderr__
+        self._parser = TracebackParser(limit)
+        self._last = None
+        self._lock = RLock()
+
+    def writable(self):
+        return True
+
+    def write(self, s):
+        self.stream.write(s)
+        with self._lock:
+            done = self._parser.feed(s)
+            if done:
+                self._last = done[-1]
+        return len(s)
+
+    def flush(self):
+        self.stream.flush()
+
+    def fileno(self):
+        return self.stream.fileno()
+
+    def isatty(self):
+        return self.stream.isatty()
+
+    @property
+    def encoding(self):
+        return self.stream.encoding
+
+    @property
+    def errors(self):
+        return self.stream.errors
+
+    def collect(self):
+        with self._lock:
+            done = self._parser.close()
+            if done:
+                self._last = done[-1]
+            last = self._last
+        if last is None:
+            return '', ''
+        return '', last.text
+
+
+class ThreadCapture(io.TextIOBase):
+
+    """ holds STDERR text until program termination, like BufferCapture,
+        but keeps each write whole and tagged with the writing thread:
+
+          - a write is one list.append(), atomic without any lock, so
+            concurrent writers never contend in the text layer
+          - at exit the traceback is taken from the writes of the thread
+            that wrote it, so output from other threads cannot break it
+            up; their writes are shown with the rest of the text """
+
+    echoed = False
+
+    def __init__(self):
+        self._writes = []           # (thread ident, text), in write order
+
+    def writable(self):
+        return True
+
+    def write(self, s):
+        self._writes.append((get_ident(), s))
+        return len(s)
+
+    def collect(self):
+        writes = list(self._writes)
+
+        by_thread = {}
+        for i, (ident, text) in enumerate(writes):
+            by_thread.setdefault(ident, []).append(i)
+
+        # find the first traceback marker written by any thread:
+        # (index of the write it starts in, offset in that write, thread)
+        start = None
+        for ident, indexes in by_thread.items():
+            pos = ''.join(writes[i][1] for i in indexes).find(TRACEBACK_STRING)
+            if pos < 0:
+                continue
+            for i in indexes:
+                if pos < len(writes[i][1]):
+                    break
+                pos -= len(writes[i][1])
+            if start is None or i < start[0]:
+                start = (i, pos, ident)
+
+        if start is None:
+            return ''.join(text for ident, text in writes), ''
+
+        index, pos, tb_ident = start
+        prev_parts = [text for ident, text in writes[:index]]
+        prev_parts.append(writes[index][1][:pos])
+        tb_parts = [writes[index][1][pos:]]
+        for ident, text in writes[index + 1:]:
+            if ident == tb_ident:
+                tb_parts.append(text)
+            else:
+                prev_parts.append(text)
+        return ''.join(prev_parts), ''.join(tb_parts)
+
+
+class SpillCapture(io.TextIOBase):
+
+    """ holds STDERR text until program termination, like BufferCapture,
+        but as UTF-8 bytes:  in memory up to threshold bytes, then in an
+        unlinked temporary file
+
+        At exit the spilled file is memory-mapped and searched for the
+        traceback, and the text before it is copied to the real STDERR
+        by the kernel (os.sendfile(), else os.copy_file_range(), else
+        chunked reads and writes), never as one string; only the
+        traceback itself is read back and decoded.  Writes are made
+        under a lock, so that concurrent writers cannot spill twice. """
+
+    echoed = False
+
+    def __init__(self, threshold=SPILL_THRESHOLD):
+        self.threshold = threshold
+        self._chunks = []           # bytes held in memory, before spilling
+        self._size = 0              # bytes held in memory
+        self._file = None           # the temporary file, once spilled
+        self._lock = RLock()
+
+    def writable(self):
+        return True
+
+    def write(self, s):
+        data = s.encode('utf-8', 'surrogatepass')
+        with self._lock:
+            if self._file is not None:
+                self._file.write(data)
+            else:
+                self._chunks.append(data)
+                self._size += len(data)
+                if self._size > self.threshold:
+                    self._spill()
+        return len(s)
+
+    def _spill(self):
+        import tempfile
+
+        self._file = tempfile.TemporaryFile()
+        self._file.writelines(self._chunks)
+        self._chunks = []
+        self._size = 0
+
+    def collect(self):
+        with self._lock:
+            fh, chunks = self._file, self._chunks
+            self._file = None
+            self._chunks = []
+            self._size = 0
+
+        if fh is None:
+            data = b''.join(chunks)
+            index = data.find(TRACEBACK_BYTES)
+            end = len(data) if index < 0 else index
+            self.replay_bytes(memoryview(data)[:end])
+            return '', data[end:].decode('utf-8', 'surrogatepass')
+
+        import mmap
+
+        with fh:
+            fh.flush()
+            fd = fh.fileno()
+            size = os.fstat(fd).st_size
+            with mmap.mmap(fd, size, access=mmap.ACCESS_READ) as mapped:
+                index = mapped.find(TRACEBACK_BYTES)
+                end = size if index < 0 else index
+                tb_data = mapped[end:]
+            self.replay(fd, end)
+        return '', tb_data.decode('utf-8', 'surrogatepass')
+
+    def replay(self, fd, count):
+        """ copy the first count bytes of the file fd to the real STDERR """
+
+        out = real_stderr_fd()
+        offset = 0
+        if out is not None:
+            sys.__stderr__.flush()
+            for copy in (_sendfile, _copy_file_range):
+                try:
+                    while offset < count:
+                        copied = copy(out, fd, offset, count - offset)
+                        if copied == 0:
+                            break
+                        offset += copied
+                    return
+                except (AttributeError, OSError):   # not available for
+                    pass                            # this pair of files
+        self._replay_chunks(fd, offset, count, out)
+
+    def _replay_chunks(self, fd, offset, count, out=None):
+        decoder = None
+        if out is None:
+            import codecs
+            decoder = codecs.getincrementaldecoder('utf-8')('replace')
+        while offset < count:
+            data = os.pread(fd, min(COPY_CHUNK, count - offset), offset)
+            if not data:
+                break
+            offset += len(data)
+            if decoder is None:
+                self.replay_bytes(data, out)
+            else:
+                replay_text(decoder.decode(data, offset >= count))
+
+    def replay_bytes(self, data, out=None):
+        """ write bytes to the real STDERR """
+
+        if not data:
+            return
+        if out is None:
+            out = real_stderr_fd()
+        if out is None:             # STDERR is not a UTF-8 file descriptor
+            replay_text(bytes(data).decode('utf-8', 'replace'))
+            return
+        sys.__stderr__.flush()
+        view = memoryview(data)
+        while view:
+            view = view[os.write(out, view[:COPY_CHUNK]):]
+
+
+def replay_text(text):
+    stream = sys.__stderr__
+    if stream is not None and text:
+        stream.write(text)
+        stream.flush()
+
+
+def real_stderr_fd():
+    """ the file descriptor of the real STDERR, if bytes can be written
+        to it directly (it takes UTF-8), else None """
+
+    stream = sys.__stderr__
+    try:
+        if stream is None or stream.encoding.lower().replace('-', '') != 'utf8':
+            return None
+        return stream.fileno()
+    except (AttributeError, ValueError, io.UnsupportedOperation):
+        return None
+
+
+def _sendfile(out, fd, offset, count):
+    return os.sendfile(out, fd, offset, count)
+
+
+def _copy_file_range(out, fd, offset, count):
+    return os.copy_file_range(fd, out, count, offset)
+
+
+CAPTURES = { 'buffer': BufferCapture,
+             'stream': StreamCapture,
+             'threaded': ThreadCapture,
+             'spill': SpillCapture }
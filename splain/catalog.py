@@ -0,0 +1,356 @@
+"""
+    catalog.py -- explanation catalog, parsed once and indexed by
+                  exception type
+
+    The catalog text (EXCEP_CONTENT in content.py) is a series of
+    exception blocks separated by '=====' lines.  Each exception block
+    is a head block (type, headline, blank line, description) followed
+    by named blocks separated by '===' lines:
+
+        KeyError
+        The code attempted to access a key that doesn't exist.
+
+        (description)
+        ===
+        DEBUG
+        (text, may name fields such as {line_no})
+
+    A named block may apply only to some error messages:  'IF' and a
+    regular expression after its name make it replace the block of
+    that name when the pattern matches the message (from its start,
+    as re.match() does; begin the pattern with '.*' to match
+    anywhere):
+
+        ===
+        DEBUG_STRATEGY IF 'NoneType' object has no attribute
+        (text used instead of DEBUG_STRATEGY for this message)
+
+    HEADLINE and DESC may be replaced the same way.  The blocks with
+    the same pattern form a variant; when several variants match, the
+    most specific one (the pattern with the most literal characters;
+    the first written, if equal) is used.  All the patterns of a type
+    are compiled into one regular expression, the variants in order of
+    specificity, each followed by an empty named group:  choosing the
+    variant is a single match() whose .lastgroup names the variant.
+    (An empty group after the pattern, rather than a group around it,
+    leaves the regex compiler free to merge the common prefixes of the
+    alternatives, which keeps the match fast with hundreds of them.)
+
+    Every block is kept as a Template that already knows its literal
+    text and placeholders, so explaining an exception is a dict lookup
+    followed by a single substitution pass per block.
+
+    Types not in the built-in catalog are looked up in catalog packs
+    (see pack.py), in the order they were added:  those named in the
+    SPLAIN_PACKS environment variable (paths separated by os.pathsep),
+    then those added with add_pack().
+
+"""
+import os
+import re
+import string
+
+EXCEP_SEP = '\n=====\n'
+BLOCK_SEP = '\n===\n'
+IF_SEP = ' IF '             # between a block name and its message pattern
+
+REGEX_SPECIAL = set('.^$*+?{}[]|()\\')
+# \1 .. \99, not preceded by another (unescaped) backslash
+NUMBERED_BACKREF_RE = re.compile(r'(?<!\\)(?:\\\\)*\\[1-9]')
+
+
+class Template:
+
+    """ catalog text split once into literal text and placeholders
+
+        .text      the original text
+        .fields    names of the placeholders, in order of appearance
+    """
+
+    __slots__ = ('text', 'fields', '_parts', '_literal')
+
+    def __init__(self, text):
+        self.text = text
+        try:
+            parts = list(string.Formatter().parse(text))
+        except ValueError:          # unbalanced braces:  all literal
+            parts = [(text, None, None, None)]
+        self._parts = parts
+        self.fields = tuple(part[1] for part in parts if part[1])
+        # with no placeholders at all, the text as rendered:  escaped
+        # braces ('{{', '}}') undoubled, as str.format() would
+        self._literal = (''.join(part[0] for part in parts)
+                         if all(part[1] is None for part in parts) else None)
+
+    def substitute(self, values):
+        """ fill placeholders from values (a dict) in one pass;
+            placeholders with no value are left as written """
+
+        if self._literal is not None:
+            return self._literal
+        out = []
+        for literal, field, spec, conversion in self._parts:
+            out.append(literal)
+            if field is None:
+                continue
+            if field not in values:
+                out.append(_placeholder(field, spec, conversion))
+                continue
+            value = values[field]
+            if conversion == 'r':
+                value = repr(value)
+            elif conversion == 'a':
+                value = ascii(value)
+            out.append(format(value, spec) if spec else str(value))
+        return ''.join(out)
+
+    def __repr__(self):
+        return 'Template({!r})'.format(self.text)
+
+
+def _placeholder(field, spec, conversion):
+    text = field
+    if conversion:
+        text += '!' + conversion
+    if spec:
+        text += ':' + spec
+    return '{' + text + '}'
+
+
+class Catalog:
+
+    """ explanation blocks indexed by exception type:
+
+          catalog['KeyError']  ->  {'headline': Template, 'desc': Template,
+                                    'debug': Template, ...}
+
+        .entries   the catalog's own entries
+        .packs     catalog packs searched for types not in .entries
+    """
+
+    def __init__(self, text):
+        self.entries = parse_catalog(text)
+        self.packs = []
+        self._dispatch = {}     # type -> MessageDispatch
+
+    def add_pack(self, pack):
+        self.packs.append(pack)
+
+    def get(self, excep_type, msg=None):
+        """ the Templates for excep_type, with the blocks of the variant
+            that best matches msg (if any); None if the type is not
+            covered """
+
+        dispatch = self._dispatch.get(excep_type)
+        if dispatch is None:
+            templates = self.entries.get(excep_type)
+            if templates is None:
+                for pack in self.packs:
+                    try:
+                        templates = pack.get(excep_type)
+                    except ValueError:      # a corrupt entry (PackError,
+                        continue            # UnicodeDecodeError)
+                    if templates is not None:
+                        break
+                else:
+                    return None
+            dispatch = self._dispatch[excep_type] = MessageDispatch(templates)
+        return dispatch.select(msg)
+
+    def __contains__(self, excep_type):
+        return self.get(excep_type) is not None
+
+    def __getitem__(self, excep_type):
+        templates = self.get(excep_type)
+        if templates is None:
+            raise KeyError(excep_type)
+        return templates
+
+    def __iter__(self):
+        seen = set(self.entries)
+        yield from self.entries
+        for pack in self.packs:
+            for excep_type in pack:
+                if excep_type not in seen:
+                    seen.add(excep_type)
+                    yield excep_type
+
+    def __len__(self):
+        return sum(1 for excep_type in self)
+
+    def render(self, excep_type, values):
+        """ return the blocks for excep_type as strings, with
+            placeholders filled from values """
+
+        return { key: template.substitute(values)
+                 for key, template in self[excep_type].items() }
+
+
+class MessageDispatch:
+
+    """ the blocks of one catalog entry, and the variants that replace
+        some of them for particular error messages
+
+        .base      {block name: Template}, for any message
+        .regex     all variant patterns as one compiled expression
+                   (None if there are no variants)
+    """
+
+    def __init__(self, templates):
+        self.base = {}
+        variants = {}           # pattern -> {block name: Template}
+        for key, template in templates.items():
+            name, sep, pattern = key.partition(IF_SEP)
+            if sep:
+                variants.setdefault(pattern, {})[name] = template
+            else:
+                self.base[key] = template
+
+        usable = []
+        for i, pattern in enumerate(variants):
+            if combinable(pattern):
+                usable.append((-specificity(pattern), i, pattern))
+        usable.sort()
+
+        self._variants = {}     # group name -> blocks
+        alternatives = []
+        for n, (score, i, pattern) in enumerate(usable):
+            group = 'v{}'.format(n)
+            alternatives.append('(?:{})(?P<{}>)'.format(pattern, group))
+            blocks = dict(self.base)
+            blocks.update(variants[pattern])
+            self._variants[group] = blocks
+        self.regex = None
+        if alternatives:
+            try:
+                self.regex = re.compile('|'.join(alternatives), re.DOTALL)
+            except re.error:        # not foreseen by combinable():  the
+                pass                # base blocks serve every message
+
+    def select(self, msg):
+        """ the blocks for an error message """
+
+        if self.regex is None or not msg:
+            return self.base
+        match = self.regex.match(msg)
+        if match is None:
+            return self.base
+        return self._variants[match.lastgroup]
+
+
+def combinable(pattern):
+    """ true if pattern still means the same once it is one alternative
+        of the combined expression:  it must compile there, and not
+        refer to its groups by name or number, which would clash with
+        (or be renumbered by) those of the other alternatives """
+
+    if NUMBERED_BACKREF_RE.search(pattern):
+        return False
+    try:
+        compiled = re.compile('(?:{})(?P<v>)'.format(pattern), re.DOTALL)
+    except re.error:            # invalid, or global flags such as (?i)
+        return False            # not at the start of the whole pattern
+    return list(compiled.groupindex) == ['v']
+
+
+def specificity(pattern):
+    """ how specific a message pattern is:  its literal characters """
+
+    count = 0
+    escaped = False
+    for char in pattern:
+        if escaped:
+            if not char.isalnum():      # \. is literal, \d is not
+                count += 1
+            escaped = False
+        elif char == '\\':
+            escaped = True
+        elif char not in REGEX_SPECIAL:
+            count += 1
+    return count
+
+
+def parse_catalog(text):
+    """ split catalog text into {type: {block_name: Template}} """
+
+    entries = {}
+    for excep_block in text.strip().split(EXCEP_SEP):
+        excep_type, blocks = parse_excep_block(excep_block)
+        entries[excep_type] = { key: Template(value)
+                                for key, value in blocks.items() }
+    return entries
+
+
+def parse_excep_block(excep_block):
+    """ split one exception block into its type and a dict of
+        block name -> text ('headline', 'desc', 'debug', ...) """
+
+    desc_blocks = excep_block.split(BLOCK_SEP)
+
+    head_block = desc_blocks[0]
+    desc_blocks = desc_blocks[1:]
+
+    # head block:  excep_type, excep_headline, excep_desc
+    head_lines = head_block.splitlines()
+    excep_type = head_lines[0].strip()
+    excep_headline = head_lines[1].strip()
+
+    if not len(head_lines) > 2:
+        excep_desc = ''
+
+    elif len(head_lines) == 3 and not head_lines[2].strip():
+        excep_desc = ''
+
+    elif head_lines[2].strip():
+        raise ValueError('head block for {} not followed by '
+                         'blank line'.format(excep_type))
+
+    elif not len(head_lines) > 3:
+        excep_desc = ''
+
+    else:
+        excep_desc = '\n'.join(head_lines[3:])
+
+    blocks = { 'headline': excep_headline,
+               'desc': excep_desc }
+
+    for block in desc_blocks:
+        block_lines = block.splitlines()
+        block_type, sep, pattern = block_lines[0].strip().partition(IF_SEP)
+        block_text = '\n'.join(block_lines[1:])
+        key = block_type.strip().lower()
+        if sep:
+            key += IF_SEP + pattern.strip()
+        blocks[key] = block_text
+
+    return excep_type, blocks
+
+
+_catalog = None
+
+def get_catalog():
+    """ return the built-in catalog, parsing it on first use """
+
+    global _catalog
+    if _catalog is None:
+        from .content import EXCEP_CONTENT
+        catalog = Catalog(EXCEP_CONTENT)
+        for path in os.environ.get('SPLAIN_PACKS', '').split(os.pathsep):
+            if path:
+                try:
+                    add_pack(path, catalog)
+                except (OSError, ValueError):   # missing or not a pack:
+                    pass                        # explain without it
+        _catalog = catalog
+    return _catalog
+
+
+def add_pack(path, catalog=None):
+    """ search the catalog pack at path for types the catalog (default:
+        the built-in one) does not cover; return the Pack """
+
+    from .pack import Pack
+
+    pack = Pack(path)
+    (catalog or get_catalog()).add_pack(pack)
+    return pack
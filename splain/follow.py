@@ -0,0 +1,265 @@
+"""
+    follow.py -- explain tracebacks as they are appended to a log file
+
+    Usage:   python -m splain --follow [--checkpoint FILE] [--interval SECS]
+                              [--from-start] LOGFILE
+
+    The file is polled every interval seconds; only the bytes appended
+    since the last poll are read, and while no traceback is in
+    progress they are searched for TRACEBACK_STRING at the byte level,
+    so only traceback lines are ever decoded and parsed.  An idle file
+    costs one os.stat() per poll.
+
+    The byte offset reached is kept in a checkpoint file, so a restart
+    picks up where the last run stopped:  catching up takes time in
+    proportion to what was written in between, not to the size of the
+    file.  The checkpoint always points at a line boundary outside any
+    traceback, so a traceback that was only partly written when the
+    checkpoint was saved is read again whole.
+
+    If the file is replaced (log rotation:  a new inode at the path),
+    the rest of the old file is read first and the new one is followed
+    from its start; if it shrinks (truncation), it is followed from its
+    start.
+
+"""
+import hashlib
+import json
+import os
+import sys
+import time
+
+from .parser import TRACEBACK_STRING, TracebackParser
+
+TRACEBACK_BYTES = TRACEBACK_STRING.encode('ascii')
+
+POLL_INTERVAL = 1.0                 # seconds between polls of an idle file
+READ_SIZE = 1024 * 1024             # bytes read at once
+MAX_TRACEBACK = 1024 * 1024         # characters; longer tracebacks are skipped
+CHECKPOINT_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'splain',
+                              'follow')
+
+
+def checkpoint_path(path):
+    """ default checkpoint file for the log file at path """
+
+    key = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()
+    return os.path.join(CHECKPOINT_DIR, key + '.json')
+
+
+class Follower:
+
+    """ reads what is appended to a log file and returns the tracebacks
+        it completes
+
+        .offset     file offset up to which everything has been handled
+                    (what the checkpoint records)
+    """
+
+    def __init__(self, path, checkpoint=None, from_start=False):
+        self.path = path
+        self.checkpoint = checkpoint
+        self.offset = 0
+        self._fh = None
+        self._ident = None          # (st_dev, st_ino) of the open file
+        self._read_pos = 0          # file offset read up to
+        self._pending = b''         # bytes read but not yet parsed
+        self._parser = TracebackParser(MAX_TRACEBACK)
+        self._from_start = from_start
+        self._saved = None          # (ident, offset) last written
+
+    def open(self):
+        """ open the file at the checkpoint, or at its end (or start,
+            with from_start) if there is no usable checkpoint; return
+            False if the file does not exist yet """
+
+        try:
+            fh = open(self.path, 'rb')
+        except FileNotFoundError:
+            return False
+        st = os.fstat(fh.fileno())
+        ident = (st.st_dev, st.st_ino)
+
+        saved = self._load_checkpoint()
+        if (saved and tuple(saved['ident']) == ident
+                and saved['offset'] <= st.st_size):
+            offset = saved['offset']
+        elif saved or self._from_start:
+            offset = 0              # rotated since the checkpoint:  a new file
+        else:
+            offset = st.st_size
+
+        self._switch(fh, ident, offset)
+        return True
+
+    def poll(self):
+        """ read what was appended since the last poll; return the
+            tracebacks completed.  The checkpoint is not saved:  call
+            save() once they have been handled, so that tracebacks lost
+            to a crash or kill in between are read again on restart. """
+
+        if self._fh is None and not self.open():
+            return []
+
+        read_pos = self._read_pos
+        done = self._read()
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            st = None
+
+        if st is not None and (st.st_dev, st.st_ino) != self._ident:
+            # rotated:  the old file is complete, follow the new one
+            done.extend(self._parser.close())
+            try:
+                fh = open(self.path, 'rb')
+            except FileNotFoundError:
+                return done
+            fst = os.fstat(fh.fileno())
+            self._switch(fh, (fst.st_dev, fst.st_ino), 0)
+            done.extend(self._read())
+
+        elif st is not None and st.st_size < self._read_pos:
+            # truncated:  start over
+            self._switch(self._fh, self._ident, 0)
+            done.extend(self._read())
+
+        if self._read_pos == read_pos and not done:
+            # nothing new:  a traceback whose error line has been
+            # written is complete, even if no line follows it yet
+            done = self._parser.flush()
+            if done:
+                self.offset = self._read_pos - len(self._pending)
+
+        return done
+
+    def follow(self, interval=POLL_INTERVAL):
+        """ yield tracebacks as they are written, forever; the
+            checkpoint is saved once the caller has taken all those of
+            a poll """
+
+        while True:
+            done = self.poll()
+            yield from done
+            self.save()
+            if not done:
+                time.sleep(interval)
+
+    def _switch(self, fh, ident, offset):
+        if self._fh is not None and self._fh is not fh:
+            self._fh.close()
+        fh.seek(offset)
+        self._fh = fh
+        self._ident = ident
+        self._read_pos = self.offset = offset
+        self._pending = b''
+        self._parser = TracebackParser(MAX_TRACEBACK)
+
+    def _read(self):
+        done = []
+        while True:
+            data = self._fh.read(READ_SIZE)
+            if not data:
+                return done
+            self._read_pos += len(data)
+            self._pending += data
+            done.extend(self._parse_pending())
+
+    def _parse_pending(self):
+        """ parse the complete lines of the pending bytes """
+
+        done = []
+        parser = self._parser
+        buf = self._pending
+        base = self._read_pos - len(buf)        # file offset of buf[0]
+        end = buf.rfind(b'\n') + 1
+        pos = 0
+        while pos < end:
+            if parser.idle:
+                # skip to the line holding the next traceback header
+                index = buf.find(TRACEBACK_BYTES, pos, end)
+                if index < 0:
+                    pos = end
+                    self.offset = base + pos
+                    break
+                pos = max(pos, buf.rfind(b'\n', pos, index) + 1)
+                self.offset = base + pos
+            newline = buf.index(b'\n', pos) + 1
+            tb = parser.feed_line(buf[pos:newline].decode('utf-8', 'replace'))
+            pos = newline
+            if tb is not None:
+                done.append(tb)
+            if parser.idle:
+                self.offset = base + pos
+
+        if parser.idle and len(buf) - pos > MAX_TRACEBACK:
+            # a very long unfinished line:  keep only enough to spot a
+            # header split across reads
+            pos = len(buf) - (len(TRACEBACK_BYTES) - 1)
+        self._pending = buf[pos:]
+        return done
+
+    def _load_checkpoint(self):
+        if not self.checkpoint:
+            return None
+        try:
+            with open(self.checkpoint) as fh:
+                saved = json.load(fh)
+            if saved.get('path') != os.path.abspath(self.path):
+                return None
+            return saved
+        except (OSError, ValueError):
+            return None
+
+    def save(self):
+        """ write the checkpoint (atomically) """
+
+        state = (self._ident, self.offset)
+        if not self.checkpoint or self._ident is None or state == self._saved:
+            return
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.checkpoint)),
+                        exist_ok=True)
+            with open(self.checkpoint + '.tmp', 'w') as fh:
+                json.dump({ 'path': os.path.abspath(self.path),
+                            'ident': list(self._ident),
+                            'offset': self.offset }, fh)
+            os.replace(self.checkpoint + '.tmp', self.checkpoint)
+            self._saved = state
+        except OSError:
+            pass
+
+    def close(self):
+        # no save():  a close forced by an error or an interrupt may
+        # come before all the tracebacks of the last poll were handled
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+
+def follow(path, checkpoint=None, interval=POLL_INTERVAL, from_start=False,
+           out=sys.stdout):
+    """ explain each traceback appended to the log file at path, until
+        interrupted """
+
+    from .splain import (Excep, ExceptionNotImplementedError,
+                         format_output, output_mode)
+
+    mode = output_mode()
+    if mode == 'interactive':           # nobody to answer a prompt
+        mode = 'text'
+
+    follower = Follower(path, checkpoint, from_start)
+    try:
+        for parsed in follower.follow(interval):
+            try:
+                xc = Excep.from_parsed(parsed)
+            except ExceptionNotImplementedError:
+                out.write(parsed.text + '\n')
+            else:
+                out.write(format_output(xc.splain, mode))
+            out.flush()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        follower.close()
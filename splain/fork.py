@@ -0,0 +1,138 @@
+"""
+    fork.py -- per-process capture for forked children
+
+    A forked child inherits a copy of its parent's capture buffer and
+    atexit handler.  after_fork_in_child() (registered with
+    os.register_at_fork() when splain is imported) gives each child a
+    fresh StreamCapture of its own:  a child that leaves through
+    os._exit() (as multiprocessing workers do) never runs the atexit
+    handler, so a capture that held its STDERR until exit would lose
+    it, traceback and all.  Written through, nothing is lost, and a
+    child that does exit normally still has its traceback explained.
+
+    After forward_children(), children instead write their STDERR
+    straight through and send each traceback they write to the parent
+    over a datagram socket -- as it is written, since children such as
+    multiprocessing workers leave through os._exit() and never run
+    atexit handlers.  The parent explains them together at exit.
+
+"""
+import json
+import os
+import socket
+import sys
+import threading
+
+from .capture import StreamCapture
+
+MAX_FORWARD = 60000         # bytes; longer tracebacks are not forwarded
+
+_sender = None              # socket children send on
+_receiver = None            # socket the parent reads from
+_forwarded = {}             # traceback text -> pids of children that sent it
+_lock = threading.Lock()
+
+
+class ForwardCapture(StreamCapture):
+
+    """ child capture:  writes STDERR through and sends each complete
+        traceback to the parent instead of explaining it """
+
+    def __init__(self, sock, stream=None):
+        super().__init__(stream)
+        self.sock = sock
+
+    def write(self, s):
+        self.stream.write(s)
+        with self._lock:                # see StreamCapture
+            done = self._parser.feed(s)
+        for tb in done:
+            self._forward(tb)
+        return len(s)
+
+    def flush(self):
+        self.stream.flush()
+        with self._lock:
+            done = self._parser.flush()
+        for tb in done:
+            self._forward(tb)
+
+    def collect(self):
+        with self._lock:
+            done = self._parser.close()
+        for tb in done:
+            self._forward(tb)
+        return '', ''
+
+    def _forward(self, tb):
+        data = json.dumps({'pid': os.getpid(), 'text': tb.text}).encode('utf-8')
+        if len(data) > MAX_FORWARD:
+            return
+        try:
+            self.sock.send(data, socket.MSG_DONTWAIT)
+        except OSError:                 # parent gone or socket full
+            pass
+
+
+def forward_children():
+    """ have forked children send their tracebacks to this process,
+        to be explained together at exit """
+
+    global _sender, _receiver
+    if _receiver is not None:
+        return
+    _receiver, _sender = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+    threading.Thread(target=_receive, name='splain-forward',
+                     daemon=True).start()
+
+
+def _receive():
+    receiver = _receiver
+    while True:
+        try:
+            data = receiver.recv(MAX_FORWARD)
+        except OSError:
+            return
+        _store(data)
+
+
+def _store(data):
+    try:
+        record = json.loads(data.decode('utf-8'))
+    except ValueError:
+        return
+    with _lock:
+        _forwarded.setdefault(record['text'], []).append(record['pid'])
+
+
+def forwarded():
+    """ return {traceback text: [child pids]} for everything children
+        have forwarded so far """
+
+    if _receiver is None:
+        return {}
+    while True:
+        try:
+            data = _receiver.recv(MAX_FORWARD, socket.MSG_DONTWAIT)
+        except OSError:                 # nothing left to read
+            break
+        _store(data)
+    with _lock:
+        return { text: list(pids) for text, pids in _forwarded.items() }
+
+
+def after_fork_in_child():
+    """ give a newly forked child its own capture """
+
+    global _receiver, _forwarded, _lock
+
+    _lock = threading.Lock()            # may have been held at fork time
+    if _sender is not None:
+        if _receiver is not None:
+            _receiver.close()
+            _receiver = None
+        _forwarded = {}
+        sys.stderr = ForwardCapture(_sender)
+
+    elif hasattr(sys.stderr, 'collect'):
+        sys.stderr = StreamCapture()
@@ -0,0 +1,138 @@
+"""
+    handler.py -- explain exceptions as they are logged, for programs
+                  that catch them and keep running
+
+        import logging, splain
+        logging.getLogger().addHandler(splain.SplainHandler())
+
+    SplainHandler explains each log record that carries an exception
+    (logger.exception(), or exc_info=True).  The logging call only
+    checks the rate limit and puts the exception on a bounded queue;
+    a background thread does the parsing, lookup and rendering, so a
+    burst of errors never slows the code that logs them.  When the
+    queue is full, or a type has been explained RATE_LIMIT times in
+    the last RATE_PERIOD seconds, the record is counted and skipped.
+
+"""
+import logging
+import queue
+import sys
+import threading
+import time
+
+QUEUE_SIZE = 100        # exceptions waiting to be explained
+RATE_LIMIT = 5          # explanations per exception type ...
+RATE_PERIOD = 60.0      # ... per this many seconds
+CLOSE_DEADLINE = 1.0    # seconds close() waits for queued explanations
+
+_STOP = object()
+
+
+class SplainHandler(logging.Handler):
+
+    """ logging handler that explains the exceptions of the records it
+        receives, on a background thread
+
+        output      'text', 'summary' or 'json' (see splain.use_output())
+        stream      where explanations are written (default: the real
+                    STDERR, since a capture would hold them until exit)
+
+        .dropped    records skipped because the queue was full
+        .limited    records skipped by the per-type rate limit
+    """
+
+    def __init__(self, level=logging.ERROR, output='text', stream=None,
+                       queue_size=QUEUE_SIZE, rate_limit=RATE_LIMIT,
+                       rate_period=RATE_PERIOD):
+        from .splain import check_live_output
+
+        super().__init__(level)
+        check_live_output(output)
+        self.output = output
+        self.stream = stream
+        self.rate_limit = rate_limit
+        self.rate_period = rate_period
+        self.dropped = 0
+        self.limited = 0
+        self._queue = queue.Queue(queue_size)
+        self._windows = {}      # exception class -> [window start, count]
+        self._thread = None
+        self._closed = False
+
+    def emit(self, record):
+        if self._closed or not record.exc_info:
+            return
+        exc_type, exc, tb = record.exc_info
+        if exc is None:
+            return
+        if not self._allow(exc_type):
+            self.limited += 1
+            return
+        try:
+            self._start()
+        except RuntimeError:            # no new threads at shutdown
+            return
+        try:
+            self._queue.put_nowait((exc, tb))
+        except queue.Full:
+            self.dropped += 1
+
+    def _allow(self, exc_type):
+        """ true if exc_type may be explained now (called under the
+            handler's lock, which logging holds around emit()) """
+
+        now = time.monotonic()
+        window = self._windows.get(exc_type)
+        if window is None or now - window[0] >= self.rate_period:
+            self._windows[exc_type] = [now, 1]
+            return True
+        if window[1] < self.rate_limit:
+            window[1] += 1
+            return True
+        return False
+
+    def _start(self):
+        if self._thread is None:
+            thread = threading.Thread(target=self._run,
+                                      name='splain-handler', daemon=True)
+            thread.start()
+            self._thread = thread
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            try:
+                self.explain(*item)
+            except Exception:
+                if logging.raiseExceptions and sys.__stderr__:
+                    import traceback
+                    sys.__stderr__.write('--- splain: error explaining '
+                                         'a logged exception ---\n')
+                    traceback.print_exc(file=sys.__stderr__)
+            item = None                 # let the traceback's frames go
+
+    def explain(self, exc, tb):
+        """ explain one exception and write it to the stream """
+
+        from .splain import ExceptionNotImplementedError, write_explanation
+
+        try:
+            write_explanation(exc, tb, self.output, self.stream)
+        except ExceptionNotImplementedError:
+            pass
+
+    def close(self, deadline=CLOSE_DEADLINE):
+        """ explain what is queued, waiting at most deadline seconds """
+
+        if not self._closed:
+            self._closed = True
+            if self._thread is not None:
+                end = time.monotonic() + deadline
+                try:
+                    self._queue.put(_STOP, timeout=deadline)
+                except queue.Full:
+                    pass
+                self._thread.join(max(0, end - time.monotonic()))
+        super().close()
@@ -0,0 +1,55 @@
+"""
+    hooks.py -- explain exceptions from sys.excepthook and
+                threading.excepthook ('hook' capture mode)
+
+    The hooks receive the live exception and traceback objects, so the
+    Excep fields are taken from them directly and STDERR never has to
+    be captured.  Exceptions splain does not cover are passed on to
+    the hooks that were installed before.
+
+"""
+import sys
+import threading
+
+_saved = None       # (sys.excepthook, threading.excepthook) before install()
+
+
+def install():
+    """ install splain's exception hooks (idempotent) """
+
+    global _saved
+    if _saved is None:
+        _saved = (sys.excepthook, threading.excepthook)
+        sys.excepthook = excepthook
+        threading.excepthook = thread_excepthook
+
+
+def uninstall():
+    """ restore the hooks that were in place before install() """
+
+    global _saved
+    if _saved is not None:
+        sys.excepthook, threading.excepthook = _saved
+        _saved = None
+
+
+def excepthook(exc_type, exc_value, tb):
+    from .splain import ExceptionNotImplementedError, explain_exception
+
+    try:
+        explain_exception(exc_value, tb)
+    except ExceptionNotImplementedError:
+        previous = _saved[0] if _saved else sys.__excepthook__
+        previous(exc_type, exc_value, tb)
+
+
+def thread_excepthook(args):
+    from .splain import ExceptionNotImplementedError, explain_exception
+
+    if args.exc_type is SystemExit:         # silently ignored, as by default
+        return
+    try:
+        explain_exception(args.exc_value, args.exc_traceback)
+    except ExceptionNotImplementedError:
+        previous = _saved[1] if _saved else threading.__excepthook__
+        previous(args)
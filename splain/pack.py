@@ -0,0 +1,243 @@
+"""
+    pack.py -- catalog packs:  explanation catalogs compiled to a
+               binary file that is memory-mapped, not parsed
+
+    Usage:   python -m splain.pack -o OUTFILE CATALOG [CATALOG ...]
+
+    A catalog pack holds entries written in the catalog syntax (see
+    catalog.py), typically for third-party exceptions, under their
+    qualified names ('requests.exceptions.ConnectionError').  Opening a
+    pack reads only its header; a lookup hashes the type name, probes
+    the hash table (usually once) and decodes only the entry found, so
+    lookup cost does not grow with the size of the pack.
+
+    Layout (little-endian):
+
+        header    magic, entry count, offsets of the sections, and
+                  the number of hash table slots
+        index     per type, sorted by name:  name (offset, length) in
+                  the string table, first block, block count
+        table     hash table, open addressing with linear probing:
+                  per slot, index position + 1 (0 for an empty slot),
+                  at least twice as many slots as types; the slot of
+                  a name is its CRC-32 modulo the number of slots
+        blocks    per block:  key (offset, length), text (offset,
+                  length) in the string table
+        strings   UTF-8 text; each distinct string stored once
+
+"""
+import mmap
+import struct
+import sys
+import zlib
+
+from .catalog import EXCEP_SEP, Template, parse_excep_block
+
+MAGIC = b'SPLNPAK1'
+# magic, count, index, table, blocks, strings, table slots
+HEADER = struct.Struct('<8sIIIIII')
+INDEX_ENTRY = struct.Struct('<IIII')    # name off, name len, block, nblocks
+SLOT = struct.Struct('<I')
+BLOCK_ENTRY = struct.Struct('<IIII')    # key off, key len, text off, text len
+
+# blocks every entry must have, as Splain shows them all
+REQUIRED_BLOCKS = ('headline', 'desc', 'debug', 'debug_strategy')
+
+
+class PackError(ValueError):
+    pass
+
+
+def compile_pack(text, path):
+    """ compile catalog text (in the catalog syntax) to a pack at path;
+        return the number of entries """
+
+    entries = {}
+    for excep_block in text.strip().split(EXCEP_SEP):
+        excep_type, blocks = parse_excep_block(excep_block)
+        entries[excep_type] = blocks
+    return write_pack(entries, path)
+
+
+def write_pack(entries, path):
+    """ write {type: {block name: text}} to a pack at path; return the
+        number of entries """
+
+    for name, blocks in entries.items():
+        missing = [key for key in REQUIRED_BLOCKS if key not in blocks]
+        if missing:
+            raise PackError('{}: no {} block'.format(name, missing[0].upper()))
+
+    strings = bytearray()
+    offsets = {}
+
+    def intern(s):
+        data = s.encode('utf-8')
+        if data not in offsets:
+            offsets[data] = len(strings)
+            strings.extend(data)
+        return offsets[data], len(data)
+
+    names = sorted(entries, key=lambda name: name.encode('utf-8'))
+    index = bytearray()
+    blocks = bytearray()
+    nblocks = 0
+    for name in names:
+        name_off, name_len = intern(name)
+        index += INDEX_ENTRY.pack(name_off, name_len, nblocks,
+                                  len(entries[name]))
+        for key, block_text in entries[name].items():
+            blocks += BLOCK_ENTRY.pack(*intern(key), *intern(block_text))
+            nblocks += 1
+
+    nslots = 1
+    while nslots < 2 * len(names):
+        nslots *= 2
+    slots = [0] * nslots
+    for i, name in enumerate(names):
+        slot = zlib.crc32(name.encode('utf-8')) % nslots
+        while slots[slot]:
+            slot = (slot + 1) % nslots
+        slots[slot] = i + 1
+    table = struct.pack('<{}I'.format(nslots), *slots)
+
+    index_off = HEADER.size
+    table_off = index_off + len(index)
+    blocks_off = table_off + len(table)
+    strings_off = blocks_off + len(blocks)
+    with open(path, 'wb') as fh:
+        fh.write(HEADER.pack(MAGIC, len(names), index_off, table_off,
+                             blocks_off, strings_off, nslots))
+        fh.write(index)
+        fh.write(table)
+        fh.write(blocks)
+        fh.write(strings)
+    return len(names)
+
+
+class Pack:
+
+    """ a memory-mapped catalog pack; looked up like a Catalog:
+
+          excep_type in pack
+          pack[excep_type]  ->  {'headline': Template, 'desc': Template, ...}
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as fh:
+            try:
+                self._map = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:          # empty file
+                raise PackError('{}: not a catalog pack'.format(path))
+        if len(self._map) < HEADER.size:
+            raise PackError('{}: not a catalog pack'.format(path))
+        (magic, self._count, self._index, self._table, self._blocks,
+         self._strings, self._nslots) = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise PackError('{}: not a catalog pack'.format(path))
+        # a truncated or corrupt pack must fail here, not at a lookup
+        if not (self._nslots > 0
+                and self._index == HEADER.size
+                and self._table == self._index + self._count * INDEX_ENTRY.size
+                and self._blocks == self._table + self._nslots * SLOT.size
+                and self._blocks <= self._strings <= len(self._map)
+                and (self._strings - self._blocks) % BLOCK_ENTRY.size == 0):
+            raise PackError('{}: corrupt catalog pack'.format(path))
+        self._nblocks = (self._strings - self._blocks) // BLOCK_ENTRY.size
+        self._decoded = {}
+
+    def _string(self, offset, length):
+        start = self._strings + offset
+        return self._map[start:start + length]
+
+    def _name(self, i):
+        name_off, name_len, block, nblocks = INDEX_ENTRY.unpack_from(
+            self._map, self._index + i * INDEX_ENTRY.size)
+        return self._string(name_off, name_len)
+
+    def find(self, excep_type):
+        """ position of excep_type in the index, or -1 """
+
+        key = excep_type.encode('utf-8')
+        nslots = self._nslots
+        slot = zlib.crc32(key) % nslots
+        for probe in range(nslots):
+            i, = SLOT.unpack_from(self._map, self._table + slot * SLOT.size)
+            if not i:
+                return -1
+            if i > self._count:
+                raise PackError('{}: corrupt catalog pack'.format(self.path))
+            if self._name(i - 1) == key:
+                return i - 1
+            slot = (slot + 1) % nslots
+        return -1                       # no empty slot:  a corrupt table
+
+    def load(self, excep_type):
+        """ decode the blocks of excep_type (None if not in the pack) """
+
+        i = self.find(excep_type)
+        if i < 0:
+            return None
+        name_off, name_len, block, nblocks = INDEX_ENTRY.unpack_from(
+            self._map, self._index + i * INDEX_ENTRY.size)
+        if block + nblocks > self._nblocks:
+            raise PackError('{}: corrupt catalog pack'.format(self.path))
+        templates = {}
+        for b in range(block, block + nblocks):
+            key_off, key_len, text_off, text_len = BLOCK_ENTRY.unpack_from(
+                self._map, self._blocks + b * BLOCK_ENTRY.size)
+            key = self._string(key_off, key_len).decode('utf-8')
+            text = self._string(text_off, text_len).decode('utf-8')
+            templates[key] = Template(text)
+        return templates
+
+    def get(self, excep_type):
+        """ the Templates of excep_type, decoded once; None if the type
+            is not in the pack """
+
+        if excep_type not in self._decoded:
+            self._decoded[excep_type] = self.load(excep_type)
+        return self._decoded[excep_type]
+
+    def __contains__(self, excep_type):
+        return self.get(excep_type) is not None
+
+    def __getitem__(self, excep_type):
+        templates = self.get(excep_type)
+        if templates is None:
+            raise KeyError(excep_type)
+        return templates
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield self._name(i).decode('utf-8')
+
+    def __len__(self):
+        return self._count
+
+    def __repr__(self):
+        return '<Pack {!r} ({} entries)>'.format(self.path, self._count)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog='python -m splain.pack',
+                                     description='compile catalog files '
+                                                 'to a catalog pack')
+    parser.add_argument('catalogs', nargs='+', metavar='CATALOG')
+    parser.add_argument('-o', '--output', required=True, metavar='OUTFILE')
+    args = parser.parse_args(argv)
+
+    texts = []
+    for path in args.catalogs:
+        with open(path, encoding='utf-8') as fh:
+            texts.append(fh.read().strip())
+    count = compile_pack(EXCEP_SEP.join(texts), args.output)
+    sys.stdout.write('{}: {} entries\n'.format(args.output, count))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,359 @@
+"""
+    parser.py -- single-pass, incremental traceback parser
+
+    TracebackParser reads text once, line by line, and returns each
+    traceback as soon as it is complete.  Text may arrive in pieces of
+    any size (feed()), so the same parser serves the streaming capture,
+    the log file analyzer and Excep.
+
+    A traceback is a list of exceptions, oldest first, as Python prints
+    them:  each after the first is linked to the one before it by
+    'cause' ("The above exception was the direct cause...") or
+    'context' ("During handling of the above exception...").  The last
+    exception is the one that terminated the program.
+
+    An exception group (Python 3.11+) is printed with a margin:  its
+    header is '  + Exception Group Traceback ...' and the lines that
+    follow start with '  | '.  The margin is removed, so the group is
+    read like any other exception; the sub-exceptions printed after
+    it (further indented, under '  +-+---- 1 ----') end the traceback,
+    and the group itself is its final exception.
+
+"""
+import collections
+import re
+
+from .capture import TRACEBACK_STRING
+CAUSE_MARKER = ('The above exception was the direct cause '
+                'of the following exception:')
+CONTEXT_MARKER = ('During handling of the above exception, '
+                  'another exception occurred:')
+
+FRAME_RE = re.compile(r'\s+File "(.*)", line (\d+)(?:, in (.*))?')
+GROUP_PREFIX = 'Exception Group '   # before TRACEBACK_STRING in a group header
+
+# parser states
+SCAN, FRAMES, ERROR, CHAIN = range(4)
+
+Frame = collections.namedtuple('Frame', 'filepath line_no function code')
+
+
+class ParsedException:
+
+    """ one exception of a traceback
+
+        .type         exception type, as printed
+        .msg          error message ('' if none)
+        .error_line   the 'Type: message' line
+        .frames       list of Frame, outermost first
+        .link         'cause', 'context' or None -- how this exception
+                      relates to the one printed before it
+    """
+
+    __slots__ = ('type', 'msg', 'error_line', 'frames', 'link')
+
+    def __init__(self, link=None):
+        self.type = ''
+        self.msg = ''
+        self.error_line = ''
+        self.frames = []
+        self.link = link
+
+    def __repr__(self):
+        return '<ParsedException {!r} ({} frames)>'.format(self.error_line,
+                                                         len(self.frames))
+
+
+class ParsedTraceback:
+
+    """ .exceptions   list of ParsedException, oldest first
+        .text         the traceback as written """
+
+    __slots__ = ('exceptions', 'text')
+
+    def __init__(self, exceptions, text):
+        self.exceptions = exceptions
+        self.text = text
+
+    @property
+    def final(self):
+        """ the exception that was raised last """
+        return self.exceptions[-1]
+
+    @classmethod
+    def from_exception(cls, exc, tb=None):
+        """ describe a live exception, and the exceptions it was raised
+            from or while handling, straight from the exception and
+            traceback objects """
+
+        import traceback
+
+        if tb is None:
+            tb = exc.__traceback__
+        text = ''.join(traceback.format_exception(type(exc), exc, tb))
+
+        exceptions = []
+        seen = set()
+        current = exc
+        while current is not None and id(current) not in seen:
+            seen.add(id(current))
+            excep = ParsedException()
+            excep.frames = [Frame(frame.filename, str(frame.lineno),
+                                  frame.name, (frame.line or '').strip())
+                            for frame in traceback.extract_tb(tb)]
+            if isinstance(current, SyntaxError):
+                line_no = current.lineno
+                excep.frames.append(Frame(current.filename or '',
+                                          '' if line_no is None else str(line_no),
+                                          None, (current.text or '').strip()))
+                excep.msg = current.msg or ''
+            else:
+                excep.msg = str(current)
+            excep.type = excep_type_name(type(current))
+            excep.error_line = excep.type
+            if excep.msg:
+                excep.error_line += ': ' + excep.msg
+            exceptions.append(excep)
+
+            if current.__cause__ is not None:
+                excep.link = 'cause'
+                current = current.__cause__
+            elif current.__context__ is not None and not current.__suppress_context__:
+                excep.link = 'context'
+                current = current.__context__
+            else:
+                current = None
+            if current is not None:
+                tb = current.__traceback__
+
+        exceptions.reverse()
+        return cls(exceptions, text)
+
+    def __repr__(self):
+        return '<ParsedTraceback {!r}>'.format(self.exceptions)
+
+
+class TracebackParser:
+
+    """ incremental traceback parser:
+
+          parser = TracebackParser()
+          for piece in pieces:
+              for tb in parser.feed(piece):
+                  ...
+          for tb in parser.close():
+              ...
+
+        limit (characters) bounds the text held for one traceback;
+        a traceback that grows past it is dropped """
+
+    def __init__(self, limit=None):
+        self.limit = limit
+        self._partial = ''
+        self._reset()
+
+    def _reset(self):
+        self._state = SCAN
+        self._exceptions = []
+        self._lines = []
+        self._committed = 0     # lines through the latest error line
+        self._size = 0
+        self._link = None
+        self._margin = ''       # '  | ' while reading an exception group
+
+    @property
+    def idle(self):
+        """ true if no traceback is in progress """
+        return self._state == SCAN and not self._partial
+
+    @property
+    def chaining(self):
+        """ true if the next traceback header continues the current
+            traceback (a cause or context marker was just read) """
+        return self._state == CHAIN
+
+    def feed(self, text):
+        """ parse a piece of text; return the tracebacks it completed """
+
+        done = []
+        lines = (self._partial + text).splitlines(True)
+        self._partial = ''
+        if lines and not lines[-1].endswith(('\n', '\r')):
+            self._partial = lines.pop()
+            if self._state == SCAN:
+                # keep only what is needed to spot a marker split
+                # across pieces
+                index = self._partial.find(TRACEBACK_STRING)
+                if index >= 0:
+                    self._partial = self._partial[index:]
+                else:
+                    self._partial = self._partial[-(len(TRACEBACK_STRING) - 1):]
+
+        for line in lines:
+            tb = self.feed_line(line)
+            if tb is not None:
+                done.append(tb)
+        return done
+
+    def close(self):
+        """ finish parsing; return the traceback still in progress, if
+            it is complete """
+
+        done = []
+        if self._partial:
+            tb = self.feed_line(self._partial)
+            self._partial = ''
+            if tb is not None:
+                done.append(tb)
+        if self._state in (ERROR, CHAIN):
+            done.append(self._finish())
+        self._reset()
+        return done
+
+    def flush(self):
+        """ return the traceback in progress if its error line has been
+            read; an incomplete traceback stays in progress """
+
+        if self._state != ERROR:
+            return []
+        tb = self._finish()
+        self._reset()
+        return [tb]
+
+    def feed_line(self, line):
+        """ parse one whole line; return the traceback it completed,
+            or None """
+
+        stripped = line.rstrip('\r\n')
+        state = self._state
+
+        if state == SCAN:
+            self._start(stripped)
+            return None
+
+        margin = self._margin
+        if margin:
+            if stripped.startswith(margin):
+                stripped = stripped[len(margin):]
+            elif stripped.rstrip() == margin.rstrip():
+                stripped = ''
+            elif state == ERROR:
+                # the sub-exceptions:  the group is complete
+                tb = self._finish()
+                self._reset()
+                return tb
+
+        if TRACEBACK_STRING in stripped:
+            if state == CHAIN:
+                self._add(stripped[stripped.index(TRACEBACK_STRING):])
+                self._exceptions.append(ParsedException(self._link))
+                self._state = FRAMES
+                return None
+            tb = self._finish() if state == ERROR else None
+            self._reset()
+            self._start(line.rstrip('\r\n'))
+            return tb
+
+        if state == FRAMES:
+            if not stripped.strip():
+                pass
+            elif stripped[0] in ' \t':
+                self._frame_line(stripped)
+            else:
+                self._error_line(stripped)
+            return self._check_limit()
+
+        if state == ERROR:
+            marker = stripped.strip()
+            if not marker:
+                self._add(stripped)
+                return None
+            if marker in (CAUSE_MARKER, CONTEXT_MARKER):
+                self._add(stripped)
+                self._link = 'cause' if marker == CAUSE_MARKER else 'context'
+                self._state = CHAIN
+                return None
+            tb = self._finish()
+            self._reset()
+            return tb
+
+        # CHAIN:  only blank lines may come before the next header
+        if not stripped.strip():
+            self._add(stripped)
+            return None
+        tb = self._finish()
+        self._reset()
+        return tb
+
+    def _start(self, stripped):
+        index = stripped.find(TRACEBACK_STRING)
+        if index >= 0:
+            self._add(stripped[index:])
+            self._exceptions.append(ParsedException())
+            self._state = FRAMES
+            prefix = stripped[:index]
+            if prefix.endswith(GROUP_PREFIX):
+                # '  + Exception Group Traceback ...':  the lines that
+                # follow have the margin '  | '
+                self._margin = prefix[:-len(GROUP_PREFIX)].replace('+', '|')
+
+    def _add(self, stripped):
+        self._lines.append(stripped)
+        self._size += len(stripped) + 1
+
+    def _frame_line(self, stripped):
+        self._add(stripped)
+        excep = self._exceptions[-1]
+        match = FRAME_RE.match(stripped)
+        if match:
+            excep.frames.append(Frame(*match.groups(), code=''))
+            return
+        code = stripped.strip()
+        if (excep.frames and not excep.frames[-1].code
+                and not set(code) <= set('^~ ')
+                and not code.startswith('[Previous line repeated')):
+            excep.frames[-1] = excep.frames[-1]._replace(code=code)
+
+    def _error_line(self, stripped):
+        self._add(stripped)
+        excep = self._exceptions[-1]
+        excep.error_line = stripped
+        excep_type, sep, msg = stripped.partition(':')
+        excep.type = excep_type.strip()
+        excep.msg = msg.strip()
+        self._committed = len(self._lines)
+        self._state = ERROR
+
+    def _check_limit(self):
+        if self.limit is not None and self._size > self.limit:
+            self._reset()
+        return None
+
+    def _finish(self):
+        exceptions = [excep for excep in self._exceptions if excep.error_line]
+        text = '\n'.join(self._lines[:self._committed]) + '\n'
+        return ParsedTraceback(exceptions, text)
+
+
+def follows_chain_marker(text):
+    """ true if text (what precedes a traceback header) ends with a
+        cause or context marker, i.e. the header continues a chain """
+
+    return text.rstrip().endswith((CAUSE_MARKER, CONTEXT_MARKER))
+
+
+def excep_type_name(exc_type):
+    """ the exception type as a traceback names it:  qualified by its
+        module unless it is a builtin or defined in __main__ """
+
+    module = exc_type.__module__
+    if module in ('builtins', '__main__'):
+        return exc_type.__qualname__
+    return module + '.' + exc_type.__qualname__
+
+
+def parse_tracebacks(text):
+    """ return every complete traceback in text """
+
+    parser = TracebackParser()
+    return parser.feed(text) + parser.close()
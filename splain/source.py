@@ -0,0 +1,159 @@
+"""
+    source.py -- source lines around the frames of a traceback
+
+    context(filepath, line_no) returns the lines around one line of a
+    source file.  Each file is read once into a line index (the byte
+    offset of every line start) and kept in a bounded LRU cache, so
+    extracting context for many frames, or many tracebacks, does not
+    read the same file over and over.  A cached file is checked
+    against its mtime and size on each use and re-read if it changed.
+    Files larger than MMAP_THRESHOLD are memory-mapped rather than
+    read, and only the lines asked for are ever decoded.
+
+"""
+import array
+import collections
+import mmap
+import os
+import threading
+
+SOURCE_CACHE_SIZE = 64              # files kept indexed
+MMAP_THRESHOLD = 1024 * 1024        # bytes; larger files are memory-mapped
+CONTEXT_LINES = 2                   # lines shown before and after
+
+
+class SourceFile:
+
+    """ one source file and the offsets of its lines
+
+        .path
+        .stamp     (mtime_ns, size) when it was read
+    """
+
+    def __init__(self, path, stamp):
+        self.path = path
+        self.stamp = stamp
+        with open(path, 'rb') as fh:
+            if stamp[1] > MMAP_THRESHOLD:
+                data = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                data = fh.read()
+        self.data = data
+
+        offsets = array.array('q', [0])
+        pos = data.find(b'\n')
+        while pos >= 0:
+            offsets.append(pos + 1)
+            pos = data.find(b'\n', pos + 1)
+        if offsets[-1] == len(data):
+            offsets.pop()           # no line after the final newline
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def lines(self, first, last):
+        """ [(line_no, text)] for lines first through last (1-based,
+            clipped to the file) """
+
+        first = max(first, 1)
+        last = min(last, len(self.offsets))
+        out = []
+        for line_no in range(first, last + 1):
+            start = self.offsets[line_no - 1]
+            end = (self.offsets[line_no] if line_no < len(self.offsets)
+                   else len(self.data))
+            text = self.data[start:end].decode('utf-8', 'replace')
+            out.append((line_no, text.rstrip('\r\n')))
+        return out
+
+
+class SourceCache:
+
+    """ LRU cache of SourceFiles, validated by mtime and size """
+
+    def __init__(self, maxsize=SOURCE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._files = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        """ the SourceFile for path, or None if it cannot be read """
+
+        try:
+            st = os.stat(path)
+        except (OSError, ValueError):
+            return None
+        stamp = (st.st_mtime_ns, st.st_size)
+
+        with self._lock:
+            source = self._files.get(path)
+            if source is not None and source.stamp == stamp:
+                self._files.move_to_end(path)
+                self.hits += 1
+                return source
+
+            self.misses += 1
+            # a SourceFile dropped here may still be in use by another
+            # thread; its memory map closes once the last user lets go
+            try:
+                source = SourceFile(path, stamp)
+            except (OSError, ValueError):
+                return None
+            self._files[path] = source
+            while len(self._files) > self.maxsize:
+                self._files.popitem(last=False)
+            return source
+
+    def clear(self):
+        with self._lock:
+            self._files.clear()
+
+
+_cache = None
+
+def get_source_cache():
+    """ return the process-wide SourceCache, creating it on first use """
+
+    global _cache
+    if _cache is None:
+        _cache = SourceCache()
+    return _cache
+
+
+def context(filepath, line_no, n=CONTEXT_LINES):
+    """ [(line_no, text)] for the n lines either side of line_no in
+        filepath; empty if the file cannot be read """
+
+    try:
+        line_no = int(line_no)
+    except (TypeError, ValueError):
+        return []
+    source = get_source_cache().get(filepath)
+    if source is None:
+        return []
+    return source.lines(line_no - n, line_no + n)
+
+
+def frame_context(frames, n=CONTEXT_LINES):
+    """ [(frame, context lines)] for a list of parser.Frame """
+
+    return [(frame, context(frame.filepath, frame.line_no, n))
+            for frame in frames]
+
+
+def format_context(frames, n=CONTEXT_LINES):
+    """ the frames with their source lines, as text; the frame's own
+        line is marked with '-->' """
+
+    out = []
+    for frame, lines in frame_context(frames, n):
+        out.append('  File "{}", line {}{}\n'.format(
+                   frame.filepath, frame.line_no,
+                   ', in ' + frame.function if frame.function else ''))
+        for line_no, text in lines:
+            marker = '-->' if str(line_no) == frame.line_no else '   '
+            out.append('  {} {:>5}  {}\n'.format(marker, line_no, text))
+    return ''.join(out)
@@ -0,0 +1,243 @@
+"""
+    store.py -- local record of the exceptions splain has explained
+
+    Each exception is filed under a fingerprint of the fields sent to
+    the exception log (type, error line, code line, line number and
+    filename), normalized so that run-to-run noise such as object
+    addresses does not make the same failure look new.  The store
+    keeps a count and first/last seen times per fingerprint in a SQLite
+    database, so that:
+
+      - a failure already logged within DEDUP_WINDOW seconds is not
+        sent again (send_log() asks should_send())
+      - the most frequent exceptions of a script can be listed
+        (top()), through an index rather than a table scan
+
+    The store is shared by every thread of the process (the exit
+    handler, SplainHandler's worker, an asyncio executor, ...):  one
+    connection, used under a lock.
+
+    Environment:
+
+        SPLAIN_STORE          database path (empty to disable the store)
+        SPLAIN_DEDUP_WINDOW   seconds within which a repeat is not re-sent
+
+"""
+import hashlib
+import os
+import re
+import sys
+import threading
+import time
+
+STORE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'splain',
+                          'exceptions.sqlite3')
+DEDUP_WINDOW = 3600.0   # seconds
+BUSY_TIMEOUT = 0.5      # seconds to wait for another process's write
+
+ADDRESS_RE = re.compile(r'\b0x[0-9a-fA-F]+\b')
+SPACE_RE = re.compile(r'\s+')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS exceptions (
+    fingerprint  TEXT PRIMARY KEY,
+    script       TEXT NOT NULL,
+    exc_type     TEXT NOT NULL,
+    error_line   TEXT NOT NULL,
+    code_line    TEXT NOT NULL,
+    line_no      TEXT NOT NULL,
+    filename     TEXT NOT NULL,
+    count        INTEGER NOT NULL,
+    first_seen   REAL NOT NULL,
+    last_seen    REAL NOT NULL,
+    last_sent    REAL
+);
+CREATE INDEX IF NOT EXISTS exceptions_by_script
+    ON exceptions (script, count DESC);
+"""
+
+
+def normalize(text):
+    """ text with object addresses masked and whitespace collapsed """
+
+    text = ADDRESS_RE.sub('0x?', str(text))
+    return SPACE_RE.sub(' ', text).strip()
+
+
+def fingerprint(exc_type, error_line, code_line, line_no, filename):
+    """ a stable key for one failure (hex digest) """
+
+    fields = [normalize(value) for value in
+              (exc_type, error_line, code_line, line_no, filename)]
+    return hashlib.sha1('\0'.join(fields).encode('utf-8')).hexdigest()
+
+
+def current_script():
+    """ absolute path of the running program ('' if there is none) """
+
+    script = sys.argv[0] if sys.argv else ''
+    return os.path.abspath(script) if script and script != '-c' else ''
+
+
+class ExceptionStore:
+
+    """ fingerprinted exception counts in a SQLite database; the
+        connection is opened on first use """
+
+    def __init__(self, path=STORE_PATH, window=DEDUP_WINDOW):
+        self.path = path
+        self.window = window
+        self._conn = None
+        self._lock = threading.RLock()
+
+    def connect(self):
+        with self._lock:
+            return self._connect()
+
+    def _connect(self):
+        if self._conn is None:
+            import sqlite3
+
+            if self.path != ':memory:':
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)),
+                            exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT,
+                                   isolation_level=None,
+                                   check_same_thread=False)
+            # one write per exit:  WAL without an fsync per commit keeps
+            # it well under a millisecond
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def record(self, payload, script=None, now=None):
+        """ count one occurrence of a send_log() payload; return True if
+            it should be sent (not sent within the last window seconds) """
+
+        if script is None:
+            script = current_script()
+        if now is None:
+            now = time.time()
+        key = fingerprint(payload['exc_type'], payload['error_line'],
+                          payload['code_line'], payload['line_no'],
+                          payload['filename'])
+
+        with self._lock:
+            return self._record(key, payload, script, now)
+
+    def _record(self, key, payload, script, now):
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT last_sent FROM exceptions '
+                               'WHERE fingerprint = ?', (key,)).fetchone()
+            if row is None:
+                send = True
+                conn.execute('INSERT INTO exceptions VALUES '
+                             '(?, ?, ?, ?, ?, ?, ?, 1, ?, ?, ?)',
+                             (key, script,
+                              payload['exc_type'],
+                              normalize(payload['error_line']),
+                              normalize(payload['code_line']),
+                              str(payload['line_no']),
+                              str(payload['filename']),
+                              now, now, now))
+            else:
+                last_sent = row[0]
+                send = last_sent is None or now - last_sent >= self.window
+                conn.execute('UPDATE exceptions SET count = count + 1, '
+                             'last_seen = ?, last_sent = ? '
+                             'WHERE fingerprint = ?',
+                             (now, now if send else last_sent, key))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return send
+
+    def top(self, script=None, n=10):
+        """ the n most frequent exceptions of script (default: the
+            running program), as dicts, most frequent first """
+
+        if script is None:
+            script = current_script()
+        with self._lock:
+            cursor = self._connect().execute(
+                'SELECT exc_type, error_line, code_line, line_no, filename, '
+                'count, first_seen, last_seen FROM exceptions '
+                'WHERE script = ? ORDER BY count DESC LIMIT ?', (script, n))
+            names = [column[0] for column in cursor.description]
+            return [dict(zip(names, row)) for row in cursor]
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_store = None
+_disabled = False
+
+def get_store():
+    """ return the process-wide ExceptionStore, or None if disabled """
+
+    global _store
+    if _disabled:
+        return None
+    if _store is None:
+        path = os.environ.get('SPLAIN_STORE', STORE_PATH)
+        if not path:
+            return None
+        window = float(os.environ.get('SPLAIN_DEDUP_WINDOW', DEDUP_WINDOW))
+        _store = ExceptionStore(path, window)
+    return _store
+
+
+def should_send(payload):
+    """ record payload in the store; return True if it should be sent
+        to the exception log.  A store that cannot be used never stops
+        a record from being sent. """
+
+    store = get_store()
+    if store is None:
+        return True
+    try:
+        return store.record(payload)
+    except Exception:           # sqlite3.Error, OSError, ...
+        return True
+
+
+def top_exceptions(script=None, n=10):
+    """ the n most frequent exceptions recorded for script (default:
+        the running program); see ExceptionStore.top() """
+
+    store = get_store()
+    if store is None:
+        return []
+    return store.top(script, n)
+
+
+def disable_store():
+    """ record nothing from this process (e.g. when analyzing log
+        files, whose exceptions are not this program's) """
+
+    global _store, _disabled
+    if _store is not None:
+        _store.close()
+    _store = None
+    _disabled = True
+
+
+def forget_store():
+    """ drop the process-wide store without closing it; a forked child
+        must not share its parent's SQLite connection """
+
+    global _store
+    _store = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=forget_store)
@@ -0,0 +1,273 @@
+"""
+    telemetry.py -- background delivery of splain's exception log
+
+    Log records are put on a bounded queue and POSTed in batches (as a
+    JSON list) by a daemon thread, so a slow or unreachable endpoint
+    never holds up the program.  At exit, close() waits at most
+    EXIT_DEADLINE seconds; anything still undelivered is written to a
+    spool directory and sent by the next run that starts the sender.
+
+    A record submitted when no thread can be started (Python 3.12+
+    refuses new threads in atexit handlers, where splain usually does
+    its work) is kept, and close() delivers it itself, together with
+    the spool, within the same deadline.
+
+    Environment:
+
+        SPLAIN_LOG_URL     endpoint to POST to (empty to disable)
+        SPLAIN_SPOOL_DIR   where undelivered batches are kept
+
+"""
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+
+LOG_URL = 'http://lyricalpictures.com/cgi-bin/splain_log.cgi'
+SPOOL_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'splain', 'spool')
+
+QUEUE_SIZE = 256        # records waiting to be sent; more are dropped
+BATCH_SIZE = 32         # records per POST
+SEND_TIMEOUT = 2.0      # seconds allowed for one POST
+EXIT_DEADLINE = 0.5     # seconds close() may spend delivering at exit
+SPOOL_LIMIT = 100       # spool files kept; the oldest are dropped
+
+_STOP = object()
+
+
+class Telemetry:
+
+    """ bounded, batching, non-blocking sender for log records """
+
+    def __init__(self, url=LOG_URL, spool_dir=SPOOL_DIR,
+                       queue_size=QUEUE_SIZE, batch_size=BATCH_SIZE,
+                       timeout=SEND_TIMEOUT):
+        self.url = url
+        self.spool_dir = spool_dir
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.dropped = 0
+        self.sent = 0
+        self._queue = queue.Queue(queue_size)
+        self._lock = threading.Lock()
+        self._inflight = []
+        self._thread = None
+        self._unthreaded = []   # records submitted when no thread could start
+        self._closed = False
+
+    def submit(self, record):
+        """ queue one record (a dict) for delivery; never blocks """
+
+        if self._closed or not self.url:
+            return
+        try:
+            self._start()
+        except RuntimeError:            # no new threads at shutdown:
+            with self._lock:            # close() delivers it
+                if len(self._unthreaded) < self._queue.maxsize:
+                    self._unthreaded.append(record)
+                else:
+                    self.dropped += 1
+            return
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self, deadline=EXIT_DEADLINE):
+        """ deliver what is queued, waiting at most deadline seconds;
+            spool whatever could not be delivered in time """
+
+        if self._closed:
+            return
+        self._closed = True
+        end = time.monotonic() + deadline
+        if self._unthreaded:
+            self.deliver(self._unthreaded, end)
+            self._unthreaded = []
+        if self._thread is None:
+            return
+
+        try:
+            self._queue.put(_STOP, timeout=deadline)
+        except queue.Full:
+            pass
+        self._thread.join(max(0, end - time.monotonic()))
+        if not self._thread.is_alive():
+            return
+
+        # out of time:  keep the rest for the next run
+        with self._lock:
+            pending = list(self._inflight)
+        while True:
+            try:
+                record = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if record is not _STOP:
+                pending.append(record)
+        if pending:
+            self.spool(pending)
+
+    def deliver(self, records, end):
+        """ send records, then what is spooled, from the calling thread,
+            giving up at the time end (time.monotonic()); spool what
+            could not be sent """
+
+        for i in range(0, len(records), self.batch_size):
+            batch = records[i:i + self.batch_size]
+            remaining = end - time.monotonic()
+            try:
+                if remaining <= 0:
+                    raise TimeoutError
+                self.post(batch, min(self.timeout, remaining))
+            except Exception:       # any delivery failure
+                self.spool(records[i:])
+                return
+            self.sent += len(batch)
+        self.flush_spool(end)
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                thread = threading.Thread(target=self._run,
+                                          name='splain-telemetry',
+                                          daemon=True)
+                thread.start()
+                self._thread = thread
+
+    def _run(self):
+        self.flush_spool()
+        stopping = False
+        while not stopping:
+            record = self._queue.get()
+            if record is _STOP:
+                break
+            batch = [record]
+            while len(batch) < self.batch_size:
+                try:
+                    record = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is _STOP:
+                    stopping = True
+                    break
+                batch.append(record)
+
+            with self._lock:
+                self._inflight = batch
+            try:
+                self.post(batch)
+                self.sent += len(batch)
+            except Exception:       # any delivery failure
+                self.spool(batch)
+            with self._lock:
+                self._inflight = []
+
+    def post(self, batch, timeout=None):
+        """ POST a list of records to the endpoint as JSON """
+
+        from urllib import request
+
+        req = request.Request(self.url,
+                              data=json.dumps(batch).encode('utf-8'),
+                              headers={'Content-Type': 'application/json'},
+                              method='POST')
+        if timeout is None:
+            timeout = self.timeout
+        with request.urlopen(req, timeout=timeout) as response:
+            response.read()
+
+    def spool(self, batch):
+        """ write an undelivered batch to the spool directory """
+
+        try:
+            os.makedirs(self.spool_dir, exist_ok=True)
+            name = '{}-{}.json'.format(time.time_ns(), os.getpid())
+            path = os.path.join(self.spool_dir, name)
+            with open(path + '.tmp', 'w') as fh:
+                json.dump(batch, fh)
+            os.replace(path + '.tmp', path)
+
+            spooled = self._spool_files()
+            for old in spooled[:-SPOOL_LIMIT]:
+                os.remove(os.path.join(self.spool_dir, old))
+        except OSError:
+            pass
+
+    def flush_spool(self, end=None):
+        """ send batches left by earlier runs, oldest first; stop at the
+            first failure (or at the time end) so they stay spooled """
+
+        for name in self._spool_files():
+            timeout = self.timeout
+            if end is not None:
+                timeout = min(timeout, end - time.monotonic())
+                if timeout <= 0:
+                    return
+            path = os.path.join(self.spool_dir, name)
+            try:
+                with open(path) as fh:
+                    batch = json.load(fh)
+            except (OSError, ValueError):
+                continue
+            try:
+                self.post(batch, timeout)
+            except Exception:
+                return
+            self.sent += len(batch)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _spool_files(self):
+        try:
+            names = os.listdir(self.spool_dir)
+        except OSError:
+            return []
+        return sorted(name for name in names if name.endswith('.json'))
+
+
+_telemetry = None
+
+def get_telemetry():
+    """ return the process-wide Telemetry, creating it on first use """
+
+    global _telemetry
+    if _telemetry is None:
+        _telemetry = Telemetry(url=os.environ.get('SPLAIN_LOG_URL', LOG_URL),
+                               spool_dir=os.environ.get('SPLAIN_SPOOL_DIR',
+                                                        SPOOL_DIR))
+        atexit.register(_telemetry.close)
+    return _telemetry
+
+
+def disable_telemetry():
+    """ send nothing from this process (e.g. when analyzing log files) """
+
+    global _telemetry
+    close_telemetry()
+    _telemetry = Telemetry(url='')
+
+
+def forget_telemetry():
+    """ drop the process-wide Telemetry without closing it; a forked
+        child must not use its parent's queue """
+
+    global _telemetry
+    _telemetry = None
+
+
+def close_telemetry():
+    """ close the process-wide Telemetry, if one was started """
+
+    if _telemetry is not None:
+        _telemetry.close()
+
+
+# a forked child starts without its parent's sender thread
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=forget_telemetry)
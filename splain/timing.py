@@ -0,0 +1,117 @@
+"""
+    timing.py -- how long each phase of explaining an exception takes
+
+    While instrumentation is on (see splain.add_timing_hook() and the
+    SPLAIN_TIMINGS environment variable), splain records the duration
+    and data size of each phase:
+
+        exit       all of read_stderr(), at program termination
+        collect    taking the text out of the capture backend
+        parse      finding and parsing the traceback
+        lookup     finding the exception type in the catalog
+        render     formatting the explanation for output
+        send_log   handing the record to the exception log
+
+    Every measurement is passed to the registered hooks and added to
+    per-phase totals; with SPLAIN_TIMINGS set to a path (or '-' for
+    STDERR), the totals are written there as JSON at exit.  While
+    instrumentation is off, each phase costs one test of a module
+    global.
+
+"""
+import json
+import os
+import sys
+import threading
+import time
+
+clock = time.perf_counter_ns        # monotonic, in nanoseconds
+
+
+def data_size(data):
+    """ size of data in bytes:  text is measured as UTF-8 """
+
+    if data is None:
+        return 0
+    if isinstance(data, int):
+        return data
+    if isinstance(data, str):
+        return len(data.encode('utf-8', 'replace'))
+    return len(data)
+
+
+def sink_hook(sink, prefix='splain.'):
+    """ a hook that reports to a statsd-style sink:  an object with a
+        timing(name, milliseconds) method """
+
+    def hook(phase, seconds, size):
+        sink.timing(prefix + phase, seconds * 1000)
+    return hook
+
+
+class Timings:
+
+    """ per-phase totals, and the hooks to tell about each measurement
+
+        .path      where dump() writes the totals (None:  nowhere)
+        .hooks     callables taking (phase, seconds, size)
+    """
+
+    clock = staticmethod(clock)
+
+    def __init__(self, path=None):
+        self.path = path
+        self.hooks = []
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def add_hook(self, hook):
+        if not callable(hook):
+            hook = sink_hook(hook)
+        self.hooks.append(hook)
+        return hook
+
+    def record(self, phase, start, data=None):
+        """ record phase as started at start (a clock() reading) and
+            ending now, having handled data (text, bytes or a size) """
+
+        seconds = (clock() - start) / 1e9
+        size = data_size(data)
+        with self._lock:
+            stats = self._stats.get(phase)
+            if stats is None:
+                stats = self._stats[phase] = { 'count': 0, 'total': 0.0,
+                                               'max': 0.0, 'bytes': 0 }
+            stats['count'] += 1
+            stats['total'] += seconds
+            stats['max'] = max(stats['max'], seconds)
+            stats['bytes'] += size
+        for hook in list(self.hooks):
+            try:
+                hook(phase, seconds, size)
+            except Exception:       # a broken hook must not stop splain
+                pass
+
+    def stats(self):
+        """ {phase: {'count', 'total', 'max', 'bytes'}}, times in
+            seconds """
+
+        with self._lock:
+            return { phase: dict(stats) for phase, stats in self._stats.items() }
+
+    def dump(self):
+        """ write stats() as JSON to .path, if one is set """
+
+        if not self.path:
+            return
+        text = json.dumps({ 'pid': os.getpid(),
+                            'phases': self.stats() }, indent=2) + '\n'
+        if self.path == '-':
+            sys.__stderr__.write(text)
+            sys.__stderr__.flush()
+            return
+        try:
+            with open(self.path, 'w') as fh:
+                fh.write(text)
+        except OSError:
+            pass